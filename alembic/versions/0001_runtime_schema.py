@@ -0,0 +1,105 @@
+"""runtime schema: log event types, lookup indexes, node cache
+
+Databases created before these columns, indexes and tables existed only get them from this
+revision, because ``create_all`` never alters tables that already exist.
+Every step checks the live schema first, so it is a no-op on databases that
+``create_all`` built from the current models.
+
+Revision ID: 0001_runtime_schema
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_runtime_schema'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_LOG_EVENT_TYPE = sa.Enum(
+    'log', 'node_started', 'node_finished', 'node_failed', name='logeventtype'
+)
+
+
+def _columns(table: str) -> dict[str, dict]:
+    return {c['name']: c for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table: str) -> dict[str, dict]:
+    return {i['name']: i for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _create_index_if_missing(name: str, table: str, columns: list[str]) -> None:
+    if name not in _indexes(table):
+        op.create_index(name, table, columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if 'event_type' not in _columns('logs'):
+        # Postgres needs the enum type before a column can use it
+        _LOG_EVENT_TYPE.create(bind, checkfirst=True)
+        op.add_column(
+            'logs',
+            sa.Column('event_type', _LOG_EVENT_TYPE, server_default='log', nullable=False),
+        )
+
+    if bind.dialect.name == 'postgresql' and not isinstance(_columns('logs')['id']['type'], sa.BigInteger):
+        op.alter_column('logs', 'id', type_=sa.BigInteger(), existing_nullable=False)
+        op.execute('ALTER SEQUENCE IF EXISTS logs_id_seq AS bigint')
+
+    _create_index_if_missing('ix_runs_workflow_id', 'runs', ['workflow_id'])
+    _create_index_if_missing('ix_logs_run_node_ts', 'logs', ['run_id', 'node_id', 'ts'])
+    _create_index_if_missing('ix_logs_run_id_id', 'logs', ['run_id', 'id'])
+
+    node_run_index = _indexes('node_runs').get('ix_node_runs_run_id_node_id')
+    if not (node_run_index and node_run_index['unique']):
+        # Keep the newest row per (run_id, node_id) so the unique index can be built
+        op.execute(
+            'DELETE FROM node_runs WHERE id NOT IN '
+            '(SELECT MAX(id) FROM node_runs GROUP BY run_id, node_id)'
+        )
+        if node_run_index:
+            op.drop_index('ix_node_runs_run_id_node_id', table_name='node_runs')
+        op.create_index('ix_node_runs_run_id_node_id', 'node_runs', ['run_id', 'node_id'], unique=True)
+
+    if not sa.inspect(bind).has_table('node_cache'):
+        op.create_table(
+            'node_cache',
+            sa.Column('hash', sa.String(length=64), nullable=False),
+            sa.Column('node_type', sa.String(length=255), nullable=False),
+            sa.Column('output_json', sa.JSON(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('hash'),
+        )
+    _create_index_if_missing('ix_node_cache_created_at', 'node_cache', ['created_at'])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table('node_cache'):
+        op.drop_table('node_cache')
+
+    node_run_index = _indexes('node_runs').get('ix_node_runs_run_id_node_id')
+    if node_run_index and node_run_index['unique']:
+        op.drop_index('ix_node_runs_run_id_node_id', table_name='node_runs')
+        op.create_index('ix_node_runs_run_id_node_id', 'node_runs', ['run_id', 'node_id'])
+
+    for name, table in (
+        ('ix_logs_run_id_id', 'logs'),
+        ('ix_logs_run_node_ts', 'logs'),
+        ('ix_runs_workflow_id', 'runs'),
+    ):
+        if name in _indexes(table):
+            op.drop_index(name, table_name=table)
+
+    # logs.id stays BIGINT: narrowing it could fail once ids pass 2**31
+    if 'event_type' in _columns('logs'):
+        op.drop_column('logs', 'event_type')
+    _LOG_EVENT_TYPE.drop(op.get_bind(), checkfirst=True)
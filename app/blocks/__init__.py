@@ -3,7 +3,3 @@ from __future__ import annotations
 # noqa: F401
 from .executors import *
 from .std import *
-from .std.audio_tts import *
-from .std.audio_stt import *
-from .std.ui_audio import *
-from .std.media import *
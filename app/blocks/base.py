@@ -1,21 +1,66 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Awaitable, Callable, Dict, Optional, Type
 
 import httpx
 from pydantic import BaseModel
 import re
-from jinja2 import Environment, StrictUndefined
+from jinja2 import Environment, StrictUndefined, Template
 
 from ..services.gcs import GCSWriter
 
 
+def has_template_syntax(text: str) -> bool:
+    """True if `text` contains any Jinja delimiter; plain strings render to themselves."""
+    return "{{" in text or "{%" in text or "{#" in text
+
+
+_STRICT_ENV = Environment(undefined=StrictUndefined, autoescape=False)
+_LENIENT_ENV = Environment(autoescape=False)
+
+
+# Compiled templates are cached by source; syntax errors raise and are not cached
+@lru_cache(maxsize=2048)
+def _compile_strict(source: str) -> Template:
+    return _STRICT_ENV.from_string(source)
+
+
+@lru_cache(maxsize=2048)
+def _compile_lenient(source: str) -> Template:
+    return _LENIENT_ENV.from_string(source)
+
+
+# A template that is exactly one `{{ a.b.c }}` reference, the most common shape in settings
+_SIMPLE_REF = re.compile(r"^\{\{\s*([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)\s*\}\}$")
+_MISSING = object()
+
+
+def _resolve_ref(path: str, ctx: Dict[str, Any]) -> Any:
+    """Resolve a dotted path like Jinja does (attribute first, then item); `_MISSING` if absent."""
+    head, *rest = path.split(".")
+    cur = ctx.get(head, _MISSING)
+    for part in rest:
+        if cur is _MISSING:
+            break
+        try:
+            cur = getattr(cur, part)
+        except AttributeError:
+            try:
+                cur = cur[part]
+            except (TypeError, LookupError):
+                cur = _MISSING
+    return cur
+
+
 @dataclass
 class RunContext:
     gcs: GCSWriter
     http: httpx.AsyncClient
     logger: Callable[[str, Dict[str, Any] | None, str | None], Awaitable[None]]
+    # Owner of the run, resolved once by the executor
+    user_id: Optional[str] = None
 
 
 class Block:
@@ -57,19 +102,25 @@ class Block:
         """Render with Jinja2 using context composed of upstream + extra (settings/trigger/etc)."""
         if not isinstance(template, str):
             return str(template)
+        if not has_template_syntax(template):
+            return template
         ctx: Dict[str, Any] = {}
         if upstream:
             ctx.update(upstream)
         if extra:
             ctx.update(extra)
-        env = Environment(undefined=StrictUndefined, autoescape=False)
+        m = _SIMPLE_REF.match(template)
+        if m is not None:
+            value = _resolve_ref(m.group(1), ctx)
+            if value is not _MISSING:
+                return value if isinstance(value, str) else str(value)
+            # Missing names fall through so strict/lenient semantics stay identical
         try:
-            return env.from_string(template).render(**ctx)
+            return _compile_strict(template).render(**ctx)
         except Exception:
             # On undefined variables or errors, fall back to empty-string behavior
             # by replacing missing variables with "" using a permissive env.
-            env2 = Environment(autoescape=False)
-            return env2.from_string(template).render(**ctx)
+            return _compile_lenient(template).render(**ctx)
 
     async def before(self, input: Dict[str, Any], ctx: RunContext) -> None:  # noqa: ARG002
         return None
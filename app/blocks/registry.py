@@ -9,6 +9,10 @@ _CLASS_REGISTRY: Dict[str, Type[Block]] = {}
 
 def register(type_name: str) -> Callable[[Type[Block]], Type[Block]]:
     def decorator(cls: Type[Block]) -> Type[Block]:
+        existing = _CLASS_REGISTRY.get(type_name)
+        # Re-registering the same class (e.g. module reload) is fine; a second definition is not
+        if existing is not None and (existing.__module__, existing.__qualname__) != (cls.__module__, cls.__qualname__):
+            raise ValueError(f"Block type already registered: {type_name} ({existing.__module__}.{existing.__qualname__})")
         _CLASS_REGISTRY[type_name] = cls
         return cls
     return decorator
@@ -29,6 +33,11 @@ def list_blocks() -> Mapping[str, Block]:
     return {key: (lambda *_args, **_kwargs: None) for key in sorted(_CLASS_REGISTRY.keys())}
 
 
+def block_count() -> int:
+    """Number of registered block types; changes whenever a new type registers."""
+    return len(_CLASS_REGISTRY)
+
+
 def list_block_specs() -> list[Dict[str, Any]]:
     specs: list[Dict[str, Any]] = []
     for t, cls in sorted(_CLASS_REGISTRY.items(), key=lambda kv: kv[0]):
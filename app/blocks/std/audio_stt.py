@@ -1,17 +1,17 @@
 from __future__ import annotations
 
 import base64
-import io
 import os
 from typing import Any, Dict, Optional
 
 import httpx
+from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 
 from ..registry import register
 from ..base import Block, RunContext
 from ...server.settings import settings
-from .media import Media
+from .media import Media, MediaDict
 
 
 class AudioSTTSettings(BaseModel):
@@ -43,14 +43,15 @@ class AudioSTTBlock(Block):
                 m = self.render_expression(m, upstream=upstream, extra=extra_ctx)
             except Exception:
                 pass
-        media_obj: Optional[Media] = None
+        media_obj: Optional[MediaDict] = None
         raw_bytes: Optional[bytes] = None
         filename: str = "audio_input"
         mime: str = "audio/mpeg"
         if isinstance(m, dict) and ("bytes_b64" in m or "uri" in m or "mime" in m):
-            media_obj = Media.model_validate(m)
+            # Upstream blocks already emit the Media shape; read it as-is instead of re-validating
+            media_obj = m  # type: ignore[assignment]
         elif isinstance(m, Media):
-            media_obj = m
+            media_obj = m.model_dump()  # type: ignore[assignment]
         elif isinstance(m, str) and (m.startswith("http://") or m.startswith("https://")):
             async with httpx.AsyncClient(timeout=s.get("timeout_seconds") or 120) as client:
                 resp = await client.get(m)
@@ -62,13 +63,13 @@ class AudioSTTBlock(Block):
             raise ValueError("audio.stt requires 'media' as Media object or URL")
 
         if media_obj is not None:
-            mime = media_obj.mime or mime
-            filename = media_obj.filename or filename
-            if media_obj.bytes_b64:
-                raw_bytes = base64.b64decode(media_obj.bytes_b64)
-            elif media_obj.uri:
+            mime = media_obj.get("mime") or mime
+            filename = media_obj.get("filename") or filename
+            if media_obj.get("bytes_b64"):
+                raw_bytes = base64.b64decode(media_obj["bytes_b64"])
+            elif media_obj.get("uri"):
                 async with httpx.AsyncClient(timeout=s.get("timeout_seconds") or 120) as client:
-                    resp = await client.get(media_obj.uri)
+                    resp = await client.get(media_obj["uri"])
                     resp.raise_for_status()
                     raw_bytes = resp.content
             else:
@@ -81,8 +82,6 @@ class AudioSTTBlock(Block):
         if (not (settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY"))) or len(raw_bytes) < 1000:
             return AudioSTTOutput(text="").model_dump()
 
-        from openai import AsyncOpenAI
-
         client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY"))
         try:
             file_tuple = (filename or "audio_input", raw_bytes, mime or "application/octet-stream")
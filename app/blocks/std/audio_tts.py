@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-import base64
+import os
+import subprocess
+import tempfile
 from typing import Any, Dict, Literal, Optional
 
+from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 
 from ..registry import register
 from ..base import Block, RunContext
 from ...server.settings import settings
-from .media import Media
+from .media import Media, MediaDict, b64encode_str
 
 
 class AudioTTSSettings(BaseModel):
@@ -23,6 +26,15 @@ class AudioTTSOutput(BaseModel):
     media: Media
 
 
+# Minimal header-like stub (not a real mp3) returned when OpenAI is unavailable
+_STUB_AUDIO = b"\x49\x44\x33"
+_STUB_AUDIO_B64 = b64encode_str(_STUB_AUDIO)
+
+
+def _stub_media(mime: str, filename: str) -> MediaDict:
+    return {"kind": "audio", "mime": mime, "bytes_b64": _STUB_AUDIO_B64, "filename": filename, "size": len(_STUB_AUDIO), "uri": None}
+
+
 @register("audio.tts")
 class AudioTTSBlock(Block):
     type_name = "audio.tts"
@@ -32,6 +44,9 @@ class AudioTTSBlock(Block):
 
     async def run(self, input: Dict[str, Any], ctx: RunContext) -> Dict[str, Any]:
         s = self.settings
+        mime = "audio/mpeg" if s.get("format") == "mp3" else "audio/wav"
+        filename = f"speech.{s.get('format')}"
+
         upstream = input.get("upstream") or {}
         extra_ctx = {"settings": s, "trigger": input.get("trigger") or {}, "nodes": upstream}
         try:
@@ -40,70 +55,62 @@ class AudioTTSBlock(Block):
             text = str(s.get("text") or "")
         if not text:
             raise ValueError("audio.tts requires non-empty 'text'")
+        if not settings.OPENAI_API_KEY:
+            # Validated like the keyed path; the stub's base64 is precomputed, so nothing else to do
+            return {"media": _stub_media(mime, filename)}
 
         data_bytes: bytes
-        mime = "audio/mpeg" if s.get("format") == "mp3" else "audio/wav"
-        filename = f"speech.{s.get('format')}"
-
-        if not settings.OPENAI_API_KEY:
-            # 1-second silence in mp3 header min (very small mock)
-            data_bytes = b"\x49\x44\x33"  # minimal header-like stub, not a real mp3
-        else:
+        try:
+            client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+            resp = await client.audio.speech.create(
+                model=s.get("model") or "tts-1",
+                voice=s.get("voice") or "alloy",
+                input=text,
+                response_format=s.get("format") or "mp3",
+            )
+            # openai v1 returns bytes-like in resp
+            # Some SDKs return .content or .data; attempt common accessors
+            data_bytes = getattr(resp, "content", None) or getattr(resp, "data", None) or bytes(resp)
+            if isinstance(data_bytes, str):
+                data_bytes = data_bytes.encode("utf-8")
+            if not isinstance(data_bytes, (bytes, bytearray)):
+                data_bytes = bytes(data_bytes)
+            await client.close()
+
+            # Play the audio as well, just for testing (docker: try mpg123 or aplay if available)
             try:
-                from openai import AsyncOpenAI
-                client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-                resp = await client.audio.speech.create(
-                    model=s.get("model") or "tts-1",
-                    voice=s.get("voice") or "alloy",
-                    input=text,
-                    response_format=s.get("format") or "mp3",
-                )
-                # openai v1 returns bytes-like in resp
-                # Some SDKs return .content or .data; attempt common accessors
-                data_bytes = getattr(resp, "content", None) or getattr(resp, "data", None) or bytes(resp)
-                if isinstance(data_bytes, str):
-                    data_bytes = data_bytes.encode("utf-8")
-                if not isinstance(data_bytes, (bytes, bytearray)):
-                    data_bytes = bytes(data_bytes)
-                await client.close()
-
-                # Play the audio as well, just for testing (docker: try mpg123 or aplay if available)
+                # Write to a temp file and play with mpg123 (for mp3) or aplay (for wav) if available
+                fmt = s.get("format") or "mp3"
+                with tempfile.NamedTemporaryFile(delete=False, suffix=f".{fmt}") as tmpf:
+                    tmpf.write(data_bytes)
+                    tmpf.flush()
+                    tmpf_name = tmpf.name
                 try:
-                    import io
-                    import subprocess
-                    import tempfile
-                    import os
-
-                    # Write to a temp file and play with mpg123 (for mp3) or aplay (for wav) if available
-                    fmt = s.get("format") or "mp3"
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{fmt}") as tmpf:
-                        tmpf.write(data_bytes)
-                        tmpf.flush()
-                        tmpf_name = tmpf.name
-                    try:
-                        played = False
-                        if fmt == "mp3":
-                            # Try mpg123
-                            if subprocess.call(["which", "mpg123"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0:
-                                subprocess.call(["mpg123", tmpf_name])
-                                played = True
-                        if not played and fmt in ("wav", "wave"):
-                            # Try aplay
-                            if subprocess.call(["which", "aplay"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0:
-                                subprocess.call(["aplay", tmpf_name])
-                                played = True
-                        if not played:
-                            await ctx.logger("audio.tts: No audio player found in docker (mpg123/aplay missing)", {})
-                    finally:
-                        os.unlink(tmpf_name)
-                except Exception as play_ex:
-                    await ctx.logger(f"audio.tts: failed to play audio locally in docker: {play_ex}", {"error": str(play_ex)})
-
-
-            except Exception as ex:
-                await ctx.logger(f"audio.tts: openai error, using silent fallback: {ex}", {"error": str(ex)})
-                data_bytes = b"\x49\x44\x33"
-
-        b64 = base64.b64encode(data_bytes).decode("ascii")
-        media = Media(kind="audio", mime=mime, bytes_b64=b64, filename=filename, size=len(data_bytes))
-        return AudioTTSOutput(media=media).model_dump() 
\ No newline at end of file
+                    played = False
+                    if fmt == "mp3":
+                        # Try mpg123
+                        if subprocess.call(["which", "mpg123"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0:
+                            subprocess.call(["mpg123", tmpf_name])
+                            played = True
+                    if not played and fmt in ("wav", "wave"):
+                        # Try aplay
+                        if subprocess.call(["which", "aplay"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0:
+                            subprocess.call(["aplay", tmpf_name])
+                            played = True
+                    if not played:
+                        await ctx.logger("audio.tts: No audio player found in docker (mpg123/aplay missing)", {})
+                finally:
+                    os.unlink(tmpf_name)
+            except Exception as play_ex:
+                await ctx.logger(f"audio.tts: failed to play audio locally in docker: {play_ex}", {"error": str(play_ex)})
+
+
+        except Exception as ex:
+            await ctx.logger(f"audio.tts: openai error, using silent fallback: {ex}", {"error": str(ex)})
+            data_bytes = _STUB_AUDIO
+
+        b64 = b64encode_str(data_bytes)
+        # Output models document the schema; the runtime path returns the
+        # equivalent dict directly instead of validating and re-dumping it
+        media: MediaDict = {"kind": "audio", "mime": mime, "bytes_b64": b64, "filename": filename, "size": len(data_bytes), "uri": None}
+        return {"media": media}
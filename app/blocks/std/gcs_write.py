@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any, Dict, Optional
 
+import orjson
 from pydantic import BaseModel, Field
 
 from ..registry import register
@@ -34,20 +35,19 @@ class GcsWriteBlock(Block):
         as_json = bool(self.settings.get("as_json"))
 
         if as_json:
-            import json
-            data_bytes = json.dumps(content).encode("utf-8")
+            data_bytes = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
             content_type = "application/json"
         else:
             if isinstance(content, (dict, list)):
-                import json
-                data_bytes = json.dumps(content).encode("utf-8")
+                data_bytes = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
                 content_type = "application/json"
             elif isinstance(content, (bytes, bytearray)):
-                data_bytes = bytes(content)
+                # bytes is immutable, so only a bytearray needs copying
+                data_bytes = content if type(content) is bytes else bytes(content)
                 content_type = "application/octet-stream"
             else:
                 data_bytes = (str(content) if content is not None else "").encode("utf-8")
                 content_type = "text/plain; charset=utf-8"
 
         uri = ctx.gcs.write_bytes(path, data_bytes, content_type=content_type)
-        return GcsWriteOutput(gcs_uri=uri, size=len(data_bytes)).model_dump()
+        return {"gcs_uri": uri, "size": len(data_bytes)}
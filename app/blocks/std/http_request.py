@@ -2,10 +2,14 @@ from __future__ import annotations
 
 from typing import Any, Dict, Optional
 
+import orjson
 from pydantic import BaseModel, Field
 
 from ..registry import register
 from ..base import Block, RunContext
+from ...services.http import ACCEPT_ENCODING
+
+_READ_CHUNK_SIZE = 1 << 16
 
 
 class HttpRequestSettings(BaseModel):
@@ -57,35 +61,59 @@ class HttpRequestBlock(Block):
             node_id=node_id,
         )
 
-        resp = await ctx.http.request(
+        content: bytes | None
+        if isinstance(body, (dict, list)):
+            # Encode JSON bodies with orjson instead of httpx's stdlib json path
+            content = orjson.dumps(body, option=orjson.OPT_NON_STR_KEYS)
+            if not any(k.lower() == "content-type" for k in headers):
+                headers = {**headers, "Content-Type": "application/json"}
+        elif body is None:
+            content = None
+        else:
+            content = str(body).encode("utf-8")
+        # Ask for compressed bodies unless the caller chose an encoding; httpx decodes transparently
+        if not any(k.lower() == "accept-encoding" for k in headers):
+            headers = {**headers, "Accept-Encoding": ACCEPT_ENCODING}
+
+        # Stream the (decoded) body into a single buffer instead of letting httpx join chunk lists
+        buf = bytearray()
+        async with ctx.http.stream(
             method,
             url,
             headers=headers,
-            json=body if isinstance(body, (dict, list)) else None,
-            content=None if isinstance(body, (dict, list, type(None))) else str(body).encode("utf-8"),
+            content=content,
             follow_redirects=follow_redirects,
             timeout=timeout_seconds,
-        )
+        ) as resp:
+            async for chunk in resp.aiter_bytes(_READ_CHUNK_SIZE):
+                buf += chunk
 
+        # Parse straight from the buffered bytes: one read, no intermediate str decode
         data: Any
         try:
-            data = resp.json()
-        except Exception:
-            buf = await resp.aread()
+            data = orjson.loads(buf)
+        except orjson.JSONDecodeError:
             try:
                 data = buf.decode("utf-8")
-            except Exception:
-                data = buf
-
-        # Log response details (with safe body preview)
-        try:
-            data_preview = data if isinstance(data, (dict, list)) else (str(data)[:1000])
-        except Exception:
-            data_preview = "<unserializable>"
+            except UnicodeDecodeError:
+                data = bytes(buf)
+
+        # Log response details (with safe body preview); slice before stringifying
+        # so large bodies are never materialised twice
+        if isinstance(data, (dict, list)):
+            data_preview = f"<json size={len(buf)}>"
+        elif isinstance(data, (bytes, bytearray)):
+            data_preview = bytes(data[:1000]).decode("utf-8", "replace")
+        elif isinstance(data, str):
+            data_preview = data[:1000]
+        else:
+            # JSON scalars (number, bool, null) are short and cannot be sliced
+            data_preview = str(data)[:1000]
+        hdrs = dict(resp.headers)
         await ctx.logger(
             f"http.request: received {resp.status_code}",
-            {"status": resp.status_code, "headers": dict(resp.headers), "data_preview": data_preview},
+            {"status": resp.status_code, "headers": hdrs, "data_preview": data_preview},
             node_id=node_id,
         )
 
-        return HttpRequestOutput(status=resp.status_code, headers=dict(resp.headers), data=data).model_dump()
+        return {"status": resp.status_code, "headers": hdrs, "data": data}
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
 from pydantic import BaseModel, Field
 from openai import AsyncOpenAI
 
 from ..registry import register
-from ..base import Block, RunContext
+from ..base import Block, RunContext, has_template_syntax
 from ...server.settings import settings
 
 
+# (model, blake2b(prompt)) -> completion text; hashed so large prompts don't pin memory
+_LLM_CACHE: OrderedDict[Tuple[str, bytes], str] = OrderedDict()
+
+
+def _cache_key(model: str, prompt: str) -> Tuple[str, bytes]:
+    return model, hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+
+
 class LlmSimpleSettings(BaseModel):
     prompt: str = Field(..., description="Prompt text to send to LLM (supports {{ }} substitutions)")
     model: Optional[str] = Field(default="gpt-5", description="OpenAI model")
@@ -33,8 +43,10 @@ class LlmSimpleBlock(Block):
         if not raw_prompt:
             raise ValueError("llm.simple requires 'prompt'")
 
-        extra_ctx = {"settings": s, "trigger": input.get("trigger") or {}}
-        prompt = self.render_expression(str(raw_prompt), upstream=input.get("upstream") or {}, extra=extra_ctx)
+        prompt = str(raw_prompt)
+        if has_template_syntax(prompt):
+            extra_ctx = {"settings": s, "trigger": input.get("trigger") or {}}
+            prompt = self.render_expression(prompt, upstream=input.get("upstream") or {}, extra=extra_ctx)
 
         node_id = input.get("node_id")
         # Log request preview
@@ -52,7 +64,19 @@ class LlmSimpleBlock(Block):
                 {"reason": "no_api_key", "text_preview": text[:500]},
                 node_id=node_id,
             )
-            return LlmSimpleOutput(text=text).model_dump()
+            return {"text": text}
+
+        cache_key = _cache_key(model, str(prompt))
+        if not settings.LLM_CACHE_DISABLED:
+            cached = _LLM_CACHE.get(cache_key)
+            if cached is not None:
+                _LLM_CACHE.move_to_end(cache_key)
+                await ctx.logger(
+                    f"llm.simple: cache hit [{model}]",
+                    {"model": model, "text_preview": cached[:1000]},
+                    node_id=node_id,
+                )
+                return {"text": cached}
 
         client = AsyncOpenAI(api_key=api_key)
         try:
@@ -62,11 +86,16 @@ class LlmSimpleBlock(Block):
                 temperature=1.0,
             )
             text = completion.choices[0].message.content or ""
+            if not settings.LLM_CACHE_DISABLED and settings.LLM_CACHE_SIZE > 0:
+                _LLM_CACHE[cache_key] = text
+                _LLM_CACHE.move_to_end(cache_key)
+                if len(_LLM_CACHE) > settings.LLM_CACHE_SIZE:
+                    _LLM_CACHE.popitem(last=False)
             await ctx.logger(
                 f"llm.simple: received [{model}]",
                 {"model": model, "text_preview": text[:1000]},
                 node_id=node_id,
             )
-            return LlmSimpleOutput(text=text).model_dump()
+            return {"text": text}
         finally:
             await client.close()
@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import base64
+
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
+from typing import Literal, Optional, TypedDict
+
+try:
+    import pybase64  # type: ignore
+except Exception:  # pragma: no cover - pybase64 optional in some envs
+    pybase64 = None  # type: ignore
 
 
 class Media(BaseModel):
@@ -10,4 +17,22 @@ class Media(BaseModel):
     bytes_b64: str
     filename: Optional[str] = Field(default=None)
     size: Optional[int] = Field(default=None)
-    uri: Optional[str] = Field(default=None) 
\ No newline at end of file
+    uri: Optional[str] = Field(default=None)
+
+
+class MediaDict(TypedDict):
+    """Runtime shape of `Media` passed between blocks; `Media` stays the schema/boundary model."""
+
+    kind: Literal["audio", "image", "file"]
+    mime: str
+    bytes_b64: str
+    filename: Optional[str]
+    size: Optional[int]
+    uri: Optional[str]
+
+
+def b64encode_str(data: bytes) -> str:
+    """Base64-encode straight to str (pybase64 writes into a pre-sized ASCII buffer)."""
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("ascii")
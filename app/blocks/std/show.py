@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from itertools import islice
 from typing import Any, Dict, Optional
 
 from pydantic import BaseModel, Field
@@ -16,6 +17,13 @@ class ShowOutput(BaseModel):
     data: Any
 
 
+def _preview(value: Any) -> str:
+    """First 120 chars of an upstream output, preferring its `text` field when it has one."""
+    if isinstance(value, dict) and "text" in value:
+        value = value["text"]
+    return str(value)[:120]
+
+
 @register("show")
 class ShowBlock(Block):
     type_name = "show"
@@ -27,42 +35,30 @@ class ShowBlock(Block):
         upstream = input.get("upstream") or {}
         template = (self.settings or {}).get("template") or ""
         node_id = input.get("node_id")
-        # Render the template using Jinja with upstream + extra context
-        extra_ctx = {
-            "settings": self.settings or {},
-            "trigger": input.get("trigger_payload") or input.get("trigger") or {},
-            "upstream": upstream,
-        }
-        try:
-            rendered = self.render_expression(template, upstream=upstream, extra=extra_ctx)
-        except Exception:
-            rendered = ""
+        rendered = ""
+        if template:
+            # Render the template using Jinja with upstream + extra context
+            extra_ctx = {
+                "settings": self.settings or {},
+                "trigger": input.get("trigger_payload") or input.get("trigger") or {},
+                "upstream": upstream,
+            }
+            try:
+                rendered = self.render_expression(template, upstream=upstream, extra=extra_ctx)
+            except Exception:
+                rendered = ""
         payload = {"upstream": upstream, "settings": self.settings, "template": template, "rendered": rendered}
         # Build concise inline summary for message
-        upstream_keys = list((upstream or {}).keys())[:20]
-        # Try to extract a short preview from first upstream value
-        preview_val = None
-        try:
-            if upstream_keys:
-                first = upstream.get(upstream_keys[0])
-                if isinstance(first, dict):
-                    if "text" in first:
-                        preview_val = str(first.get("text"))[:120]
-                    else:
-                        preview_val = str(first)[:120]
-                else:
-                    preview_val = str(first)[:120]
-        except Exception:
-            preview_val = None
+        upstream_keys = list(islice(upstream, 20))
+        # Short preview from the first upstream value
+        preview_val = _preview(upstream[upstream_keys[0]]) if upstream_keys else None
 
         message = f"ShowBlock rendered upstream_keys={upstream_keys}"
         if preview_val:
             message += f" preview={preview_val!r}"
 
-        # Log a compact preview and full payload in data
-        try:
-            preview = {"upstream_keys": upstream_keys, "preview": preview_val, "has_rendered": bool(rendered)}
-        except Exception:
-            preview = {"upstream_keys": "<error>"}
-        await ctx.logger(message, {"preview": preview, "full": payload}, node_id=node_id)
-        return ShowOutput(data=payload).model_dump() 
\ No newline at end of file
+        # Log a compact preview plus the rendered text; the full payload (including
+        # upstream) is already persisted as the node output, so don't serialise it twice
+        preview = {"upstream_keys": upstream_keys, "preview": preview_val, "has_rendered": bool(rendered)}
+        await ctx.logger(message, {"preview": preview, "rendered": rendered}, node_id=node_id)
+        return {"data": payload} 
\ No newline at end of file
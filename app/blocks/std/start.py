@@ -26,5 +26,7 @@ class StartBlock(Block):
     async def run(self, input: Dict[str, Any], ctx: RunContext) -> Dict[str, Any]:
         payload = self.settings.get("payload")
         if payload is None:
-            payload = (input.get("trigger") or {})
-        return StartOutput(data=payload).model_dump()
+            # A fresh dict: the output flows into downstream inputs and run outputs, which may mutate it
+            payload = input.get("trigger") or {}
+        # `data` is Any, so StartOutput would only rebuild this dict; it stays as the declared schema
+        return {"data": payload}
@@ -36,4 +36,4 @@ class UIAudioBlock(Block):
                 file_value = self.render_expression(file_value, upstream=upstream, extra=extra_ctx)
             except Exception:
                 pass
-        return UIAudioOutput(ok=True, file=file_value, title=s.get("title")).model_dump() 
\ No newline at end of file
+        return {"ok": True, "file": file_value, "title": s.get("title")} 
\ No newline at end of file
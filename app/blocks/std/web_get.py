@@ -1,11 +1,32 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict, Optional, Literal
 
+import orjson
 from pydantic import BaseModel, Field
 
 from ..registry import register
-from ..base import Block, RunContext
+from ..base import Block, RunContext, has_template_syntax
+
+
+# Shared read-only default for missing upstream/trigger
+_EMPTY: Dict[str, Any] = {}
+
+# Top-level dict/list size from which a JSON request body is encoded in a worker thread
+_THREAD_ENCODE_MIN_ITEMS = 1000
+
+# Bytes a JSON document can start with after whitespace (objects, arrays, strings, numbers, literals)
+_JSON_LEAD = frozenset(b'{["-0123456789tfn')
+_JSON_WS = b" \t\r\n"
+
+
+def _looks_like_json(buf: bytes) -> bool:
+    """Sniff the first non-whitespace byte so auto mode skips parses that cannot succeed."""
+    for b in buf:
+        if b not in _JSON_WS:
+            return b in _JSON_LEAD
+    return False
 
 
 class WebGetSettings(BaseModel):
@@ -49,17 +70,14 @@ class WebGetBlock(Block):
         timeout_seconds = float(s.get("timeout_seconds", 30.0))
         desired_mode = s.get("response_mode", "auto")
 
-        url = self.render_expression(
-            str(url_raw),
-            upstream=input.get("upstream") or {},
-            extra={"settings": s, "trigger": input.get("trigger") or {}},
-        )
-        if isinstance(body, str):
-            body = self.render_expression(
-                body,
-                upstream=input.get("upstream") or {},
-                extra={"settings": s, "trigger": input.get("trigger") or {}},
-            )
+        upstream = input.get("upstream") or _EMPTY
+        render_extra = {"settings": s, "trigger": input.get("trigger") or _EMPTY}
+
+        url = str(url_raw)
+        if has_template_syntax(url):
+            url = self.render_expression(url, upstream=upstream, extra=render_extra)
+        if isinstance(body, str) and has_template_syntax(body):
+            body = self.render_expression(body, upstream=upstream, extra=render_extra)
 
         node_id = input.get("node_id")
         # Log request details (with safe body preview)
@@ -81,106 +99,83 @@ class WebGetBlock(Block):
             node_id=node_id,
         )
 
+        content: bytes | None
+        if isinstance(body, (dict, list)):
+            # orjson instead of httpx's stdlib json path; very large bodies encode off the event loop
+            if len(body) < _THREAD_ENCODE_MIN_ITEMS:
+                content = orjson.dumps(body, option=orjson.OPT_NON_STR_KEYS)
+            else:
+                content = await asyncio.to_thread(orjson.dumps, body, option=orjson.OPT_NON_STR_KEYS)
+            if not any(k.lower() == "content-type" for k in headers):
+                headers = {**headers, "Content-Type": "application/json"}
+        elif body is None:
+            content = None
+        else:
+            content = str(body).encode("utf-8")
+
         resp = await ctx.http.request(
             method,
             url,
             headers=headers,
-            json=body if isinstance(body, (dict, list)) else None,
-            content=None if isinstance(body, (dict, list, type(None))) else str(body).encode("utf-8"),
+            content=content,
             follow_redirects=follow_redirects,
             timeout=timeout_seconds,
         )
 
-        # Parse response according to mode
-        chosen_mode: Literal["json", "text", "bytes"]
-        data: Any = None
+        # Read the body once and parse from those bytes; each mode tries its preferred
+        # representation first and falls back in order, ending with raw bytes
+        try:
+            buf = await resp.aread()
+        except Exception:
+            buf = b""
+        chosen_mode: Literal["json", "text", "bytes"] = "bytes"
+        data: Any = buf
         data_text: Optional[str] = None
         data_json: Optional[Any] = None
 
-        if desired_mode == "json":
-            try:
-                data_json = resp.json()
-                data = data_json
-                chosen_mode = "json"
-            except Exception:
-                # Fallback to text then bytes
-                try:
-                    buf = await resp.aread()
-                except Exception:
-                    buf = b""
-                try:
-                    data_text = buf.decode("utf-8")
-                    data = data_text
-                    chosen_mode = "text"
-                except Exception:
-                    data = buf
-                    chosen_mode = "bytes"
-        elif desired_mode == "text":
-            try:
-                buf = await resp.aread()
-            except Exception:
-                buf = b""
-            try:
-                data_text = buf.decode("utf-8")
-                data = data_text
-                chosen_mode = "text"
-            except Exception:
-                # Fallback to json or bytes
-                try:
-                    data_json = resp.json()
-                    data = data_json
-                    chosen_mode = "json"
-                except Exception:
-                    data = buf
-                    chosen_mode = "bytes"
-        elif desired_mode == "bytes":
-            try:
-                buf = await resp.aread()
-            except Exception:
-                buf = b""
-            data = buf
-            chosen_mode = "bytes"
-        else:  # auto
-            # Try JSON first
-            try:
-                data_json = resp.json()
-                data = data_json
-                chosen_mode = "json"
-            except Exception:
-                # Try text
-                try:
-                    buf = await resp.aread()
-                except Exception:
-                    buf = b""
+        if desired_mode != "bytes":
+            if desired_mode == "text":
+                attempts = ("text", "json")
+            elif desired_mode == "json" or _looks_like_json(buf):
+                attempts = ("json", "text")
+            else:
+                attempts = ("text",)
+            for mode in attempts:
                 try:
-                    data_text = buf.decode("utf-8")
-                    data = data_text
-                    chosen_mode = "text"
-                except Exception:
-                    data = buf
-                    chosen_mode = "bytes"
+                    if mode == "json":
+                        data_json = orjson.loads(buf)
+                        data = data_json
+                    else:
+                        data_text = buf.decode("utf-8")
+                        data = data_text
+                except ValueError:  # orjson.JSONDecodeError / UnicodeDecodeError
+                    continue
+                chosen_mode = mode
+                break
 
         # Log response details (with safe body preview)
         try:
             data_preview = data if isinstance(data, (dict, list)) else (str(data)[:1000])
         except Exception:
             data_preview = "<unserializable>"
+        headers_out = dict(resp.headers)
         await ctx.logger(
             f"web.get: received {resp.status_code}",
             {
                 "status": resp.status_code,
-                "headers": dict(resp.headers),
+                "headers": headers_out,
                 "data_preview": data_preview,
                 "response_mode": chosen_mode,
             },
             node_id=node_id,
         )
 
-        return WebGetOutput(
-            status=resp.status_code,
-            headers=dict(resp.headers),
-            data=data,
-            data_text=data_text,
-            data_json=data_json,
-            response_mode=chosen_mode,
-        ).model_dump() 
\ No newline at end of file
+        # Every field already has its declared type, so skip the WebGetOutput validate/dump round-trip
+        return {
+            "status": resp.status_code,
+            "headers": headers_out,
+            "data": data,
+            "data_text": data_text,
+            "data_json": data_json,
+            "response_mode": chosen_mode,
+        }
@@ -4,7 +4,7 @@ import enum
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from sqlalchemy import JSON, Enum, ForeignKey, Index, String, Text
+from sqlalchemy import JSON, BigInteger, Enum, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -19,6 +19,15 @@ class RunStatusEnum(str, enum.Enum):
     failed = "failed"
 
 
+class LogEventType(str, enum.Enum):
+    """What a log row marks in the run; anything other than `log` is also sent to streams as its own event."""
+
+    log = "log"
+    node_started = "node_started"
+    node_finished = "node_finished"
+    node_failed = "node_failed"
+
+
 class Workflow(Base):
     __tablename__ = "workflows"
 
@@ -37,7 +46,7 @@ class Run(Base):
     __tablename__ = "runs"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    workflow_id: Mapped[int] = mapped_column(ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False)
+    workflow_id: Mapped[int] = mapped_column(ForeignKey("workflows.id", ondelete="CASCADE"), index=True, nullable=False)
     user_id: Mapped[Optional[str]] = mapped_column(String(255), index=True, nullable=True)
     status: Mapped[RunStatusEnum] = mapped_column(Enum(RunStatusEnum), default=RunStatusEnum.pending, nullable=False)
     started_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
@@ -68,28 +77,45 @@ class NodeRun(Base):
     run: Mapped[Run] = relationship("Run", back_populates="node_runs")
 
     __table_args__ = (
-        Index("ix_node_runs_run_id_node_id", "run_id", "node_id", unique=False),
+        # The executor writes exactly one row per node per run
+        Index("ix_node_runs_run_id_node_id", "run_id", "node_id", unique=True),
     )
 
 
 class Log(Base):
     __tablename__ = "logs"
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # Append-only and one row per log line, so 64-bit ids; sqlite only autoincrements INTEGER keys
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("runs.id", ondelete="CASCADE"), nullable=False)
     node_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     ts: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False)
     level: Mapped[str] = mapped_column(String(16), default="info", nullable=False)
     message: Mapped[str] = mapped_column(Text, nullable=False)
     data_json: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    event_type: Mapped[LogEventType] = mapped_column(Enum(LogEventType), default=LogEventType.log, server_default=LogEventType.log.value, nullable=False)
 
     run: Mapped[Run] = relationship("Run", back_populates="logs")
 
     __table_args__ = (
         Index("ix_logs_run_id_ts", "run_id", "ts"),
+        Index("ix_logs_run_node_ts", "run_id", "node_id", "ts"),
+        # Keyset reads: streams and paged /logs fetch a run's rows with id > cursor in id order
+        Index("ix_logs_run_id_id", "run_id", "id"),
     )
 
 
+class NodeCache(Base):
+    """Outputs of successful node executions keyed by a BLAKE2b hash of everything the node saw."""
+
+    __tablename__ = "node_cache"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    node_type: Mapped[str] = mapped_column(String(255), nullable=False)
+    output_json: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, nullable=False, index=True)
+
+
 class ComposioAccount(Base):
     __tablename__ = "composio_accounts"
 
@@ -1,21 +1,74 @@
 from __future__ import annotations
 
+from typing import Any, Dict
+
+import orjson
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from ..server.settings import settings
 
 
+def _json_dumps(value: Any) -> str:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 def get_async_engine() -> AsyncEngine:
-    return create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+    pool_kwargs: Dict[str, Any] = {}
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        # Bounded pool of warm connections; TLS is configured via `sslmode` in DATABASE_URL
+        pool_kwargs = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        }
+    # orjson for every JSON column (graphs, node inputs/outputs, log data) on both sqlite and asyncpg
+    return create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        future=True,
+        json_serializer=_json_dumps,
+        json_deserializer=orjson.loads,
+        **pool_kwargs,
+    )
 
 
-import ssl
+def _jsonb_encode(text: str) -> bytes:
+    # Binary jsonb is a version byte (1) followed by the JSON text
+    return b"\x01" + text.encode()
 
-ssl_ctx = ssl.create_default_context()
 
-engine: AsyncEngine = get_async_engine().execution_options(
-    connect_args={"ssl": ssl_ctx}
-)
+def _jsonb_decode(data: bytes) -> Any:
+    return orjson.loads(memoryview(data)[1:])
+
+
+async def _set_orjson_codecs(conn: Any) -> None:
+    await conn.set_type_codec("json", encoder=str.encode, decoder=orjson.loads, schema="pg_catalog", format="binary")
+    await conn.set_type_codec("jsonb", encoder=_jsonb_encode, decoder=_jsonb_decode, schema="pg_catalog", format="binary")
+
+
+engine: AsyncEngine = get_async_engine()
+
+if engine.dialect.driver == "asyncpg":
+    # SQLAlchemy's default asyncpg codecs decode wire bytes to str before deserialising;
+    # orjson parses the bytes directly. Runs after the dialect's own codec setup.
+    @event.listens_for(engine.sync_engine, "connect")
+    def _register_json_codecs(dbapi_connection: Any, _record: Any) -> None:
+        dbapi_connection.run_async(_set_orjson_codecs)
+
+if engine.dialect.name == "sqlite":
+    # WAL lets SSE polls and API reads proceed while the run's writer commits; NORMAL fsyncs
+    # at checkpoints rather than on every commit, which is still durable under WAL.
+    # SQLite ignores foreign keys unless asked, and workflow deletes rely on ON DELETE CASCADE
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection: Any, _record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
 SessionFactory: async_sessionmaker[AsyncSession] = async_sessionmaker(
     bind=engine,
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List
+
+
+# Streams re-read the database on wakeup, so one pending wakeup per subscriber is enough
+_subscribers: Dict[int, List[asyncio.Queue[None]]] = {}
+
+
+def subscribe(run_id: int) -> asyncio.Queue[None]:
+    """Register for wakeups whenever the run's logs or status are committed in this process."""
+    queue: asyncio.Queue[None] = asyncio.Queue(maxsize=1)
+    _subscribers.setdefault(run_id, []).append(queue)
+    return queue
+
+
+def unsubscribe(run_id: int, queue: asyncio.Queue[None]) -> None:
+    queues = _subscribers.get(run_id)
+    if not queues:
+        return
+    try:
+        queues.remove(queue)
+    except ValueError:
+        pass
+    if not queues:
+        del _subscribers[run_id]
+
+
+def publish(run_id: int) -> None:
+    """Wake the run's subscribers. Call after commit, so a woken reader sees the change."""
+    for queue in _subscribers.get(run_id, ()):
+        if queue.empty():
+            queue.put_nowait(None)
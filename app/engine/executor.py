@@ -1,19 +1,45 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime
-from typing import Any, Dict
-
-from sqlalchemy import select, update, insert
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, select, update, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from ..blocks.base import RunContext
 from ..blocks.registry import run_block
-from ..db.models import Run, Workflow, NodeRun
-from ..engine.graph import toposort, build_parent_child_maps
+from ..db.models import Run, Workflow, NodeRun, NodeCache, LogEventType
+from ..server.settings import settings
 from ..services.gcs import GCSWriter
-from ..services.http import create_http_client
-from .logging import insert_log
+from ..services.http import get_http_client
+from ..schemas.graph import Graph, Node
+from . import events
+from .logging import AsyncLogListener, notify_run_event
+
+
+_log = logging.getLogger("engine.executor")
+
+# Run outputs larger than this are written to GCS; runs.outputs_json then holds {OUTPUTS_GCS_KEY: uri}
+_OUTPUTS_SPILL_BYTES = 64 * 1024
+OUTPUTS_GCS_KEY = "__gcs__"
+
+# Validated graphs and their execution plans, keyed by (workflow id, graph content hash)
+_GRAPH_CACHE_SIZE = 256
+_GRAPH_CACHE: "OrderedDict[Tuple[int, str], _PreparedGraph]" = OrderedDict()
+
+# Expired node_cache rows are deleted at most this often per process, alongside a cache write
+_NODE_CACHE_PRUNE_INTERVAL_SECONDS = 3600.0
+_node_cache_next_prune = 0.0
 
 
 async def execute_run(run_id: int, SessionFactory, gcs_bucket: str | None = None) -> None:
@@ -22,149 +48,348 @@ async def execute_run(run_id: int, SessionFactory, gcs_bucket: str | None = None
         if run is None:
             return
 
-        await _mark_run_running(session, run.id)
+        await _mark_run_running(session, run.id, now=datetime.utcnow())
         await session.commit()
+        events.publish(run.id)
 
-        # Build graph and topo order
-        from ..schemas.graph import Graph
-
-        graph = Graph.model_validate(run.workflow.graph_json)
-        order = toposort(graph)
-        parents_map, _ = build_parent_child_maps(graph)
+        # Build graph and topo order (cached per workflow version)
+        prepared = _prepare_graph(run.workflow.id, run.workflow.graph_json)
+        graph = prepared.graph
+        nodes_by_id = prepared.nodes_by_id
+        parents_map = prepared.parents_map
+        tool_children = prepared.tool_children
+        node_category = prepared.node_category
 
         outputs: Dict[str, Dict[str, Any]] = {}
-
-        # Map tool edges per agent node
-        tool_children: Dict[str, Dict[str, Any]] = {}
-        for e in graph.edges:
-            if getattr(e, "kind", "control") == "tool":
-                if e.from_node not in tool_children:
-                    tool_children[e.from_node] = []
-                tool_children[e.from_node].append(e.to)
+        # Content hashes of node outputs, only tracked when the workflow opts into memoization
+        output_digests: Dict[str, Optional[str]] = {}
 
         # Shared context resources
-        http_client = create_http_client()
+        # Shared across runs for connection reuse; closed on app shutdown, not here
+        http_client = get_http_client()
         gcs = GCSWriter(bucket_name=gcs_bucket) if gcs_bucket else GCSWriter()
 
+        # Log rows are written by a background task so blocks never wait on the database to log
+        log_listener = AsyncLogListener(SessionFactory)
+        log_listener.start()
+
         async def logger(message: str, data: Dict[str, Any] | None = None, node_id: str | None = None) -> None:
-            await insert_log(session, run.id, message, node_id=node_id, data=data)
+            log_listener.enqueue(run.id, message, node_id=node_id, data=data)
+
+        # Prefer run.user_id (denormalized) and fall back to workflow.user_id; do NOT default to a system user
+        ctx = RunContext(
+            gcs=gcs,
+            http=http_client,
+            logger=logger,
+            user_id=getattr(run, "user_id", None) or getattr(run.workflow, "user_id", None),
+        )
 
-        ctx = RunContext(gcs=gcs, http=http_client, logger=logger)
+        async def run_node(node_id: str, node_run_id: int | None) -> Dict[str, Any] | None:
+            node = nodes_by_id[node_id]
+            # One clock read per bookkeeping point, shared by its DB row and its log line
+            now = datetime.utcnow()
+
+            # Skip tool nodes
+            if node_category[node.id] == "tool":
+                log_listener.enqueue(run.id, f"Skipping tool node {node.id} in main execution (invoked via agent tools)", node_id=node.id, ts=now)
+                return None
+
+            log_listener.enqueue(run.id, f"Starting node {node.id}", node_id=node.id, ts=now, event_type=LogEventType.node_started)
+
+            upstream_outputs = {pid: outputs[pid] for pid in parents_map.get(node.id, []) if pid in outputs}
+
+            node_input: Dict[str, Any] = {
+                "settings": getattr(node, "settings", {}) or {},
+                "upstream": upstream_outputs,
+                "trigger": run.trigger_payload_json,
+                "node_id": node.id,
+                "user_id": ctx.user_id,
+            }
+
+            # Attach derived tools for agent nodes
+            if node_category[node.id] == "agent" and tool_children.get(node.id):
+                derived_tools = []
+                for tool_node_id in tool_children.get(node.id, []):
+                    tnode = nodes_by_id.get(tool_node_id)
+                    if tnode is None:
+                        continue
+                    tsettings = getattr(tnode, "settings", {}) or {}
+                    derived_tools.append({
+                        "id": getattr(tnode, "id", tool_node_id),
+                        "name": tsettings.get("name") or getattr(tnode, "id", tool_node_id),
+                        "type": getattr(tnode, "type", ""),
+                        "settings": tsettings,
+                    })
+                node_input["__derived_tools_from_edges__"] = derived_tools
+
+            # Persist upstream by id only: each upstream output is already stored on its own node row.
+            # Built before the block runs so in-place edits by the block don't leak into the record.
+            persist_input = {k: v for k, v in node_input.items() if k != "upstream"}
+            persist_input["upstream_ids"] = list(upstream_outputs)
+
+            cache_key: Optional[str] = None
+            if graph.memoize:
+                cache_key = _node_cache_key(node.type, node_input, [(pid, output_digests.get(pid)) for pid in upstream_outputs])
+            # AsyncSession is not concurrency-safe, so each node of a wave commits through its own session
+            async with SessionFactory() as node_session:  # type: AsyncSession
+                if cache_key is not None:
+                    cached = await _load_cached_output(node_session, cache_key)
+                    if cached is not None:
+                        await _persist_node_cached(node_session, node_run_id, persist_input, cached, now=now)
+                        await node_session.commit()
+                        output_digests[node.id] = _digest(cached)
+                        log_listener.enqueue(run.id, f"Reused cached output for node {node.id}", node_id=node.id, ts=now, event_type=LogEventType.node_finished)
+                        return cached
+                    # End the lookup's read transaction so the block does not hold a connection while it runs
+                    await node_session.rollback()
 
-        try:
-            for node_id in order:
-                node = next(n for n in graph.nodes if n.id == node_id)
-
-                # Skip tool nodes
-                if str(node.type).startswith("tool."):
-                    await logger(f"Skipping tool node {node.id} in main execution (invoked via agent tools)", node_id=node.id)
-                    continue
-
-                await logger(f"Starting node {node.id}", node_id=node.id)
-
-                upstream_outputs = {pid: outputs[pid] for pid in parents_map.get(node.id, []) if pid in outputs}
-                # Prefer run.user_id (denormalized) and fall back to workflow.user_id; do NOT default to a system user
-                effective_user_id = getattr(run, "user_id", None) or getattr(run.workflow, "user_id", None)
-
-                node_input: Dict[str, Any] = {
-                    "settings": getattr(node, "settings", {}) or {},
-                    "upstream": upstream_outputs,
-                    "trigger": run.trigger_payload_json,
-                    "node_id": node.id,
-                    "user_id": effective_user_id,
-                }
-
-                # Attach derived tools for agent nodes
-                if str(node.type).startswith("agent.") and tool_children.get(node.id):
-                    derived_tools = []
-                    for tool_node_id in tool_children.get(node.id, []):
-                        tnode = next((n for n in graph.nodes if n.id == tool_node_id), None)
-                        if tnode is None:
-                            continue
-                        tsettings = getattr(tnode, "settings", {}) or {}
-                        derived_tools.append({
-                            "id": getattr(tnode, "id", tool_node_id),
-                            "name": tsettings.get("name") or getattr(tnode, "id", tool_node_id),
-                            "type": getattr(tnode, "type", ""),
-                            "settings": tsettings,
-                        })
-                    node_input["__derived_tools_from_edges__"] = derived_tools
-
-                await _mark_node_status(session, run.id, node.id, node.type, status="running")
-                await session.commit()
                 try:
                     result = await run_block(node.type, node_input, ctx)
-                    outputs[node.id] = result
-                    await _persist_node_success(session, run.id, node.id, node.type, node_input, result)
-                    await session.commit()
-                    await logger(f"Finished node {node.id}", node_id=node.id)
+                    if graph.memoize:
+                        output_digests[node.id] = _digest(result)
+                    now = datetime.utcnow()
+                    await _persist_node_success(node_session, node_run_id, persist_input, result, now=now)
+                    if cache_key is not None:
+                        await _store_cached_output(node_session, cache_key, node.type, result)
+                    await node_session.commit()
+                    log_listener.enqueue(run.id, f"Finished node {node.id}", node_id=node.id, ts=now, event_type=LogEventType.node_finished)
+                    return result
                 except Exception as ex:
-                    await _persist_node_error(session, run.id, node.id, node.type, node_input, ex)
-                    await session.commit()
-                    await logger(f"Node {node.id} failed: {ex}", {"error": str(ex)}, node_id=node.id)
+                    now = datetime.utcnow()
+                    await _persist_node_error(node_session, node_run_id, persist_input, ex, now=now)
+                    await node_session.commit()
+                    log_listener.enqueue(run.id, f"Node {node.id} failed: {ex}", node_id=node.id, data={"error": str(ex)}, ts=now, event_type=LogEventType.node_failed)
                     raise
 
-            await _mark_run_succeeded(session, run.id, outputs)
+        try:
+            # Each wave only depends on earlier waves, so its nodes' I/O overlaps
+            for wave in prepared.levels:
+                # Tool nodes only run through their agent, so they get no row of their own
+                runnable = [(node_id, nodes_by_id[node_id].type) for node_id in wave if node_category[node_id] != "tool"]
+                node_run_ids: Dict[str, int] = {}
+                if runnable:
+                    # One multi-row insert per wave; committed up front because get_run reports running rows as current nodes
+                    node_run_ids = await _mark_node_status(session, run.id, runnable, status="running", now=datetime.utcnow())
+                    await session.commit()
+                results = await asyncio.gather(*(run_node(node_id, node_run_ids.get(node_id)) for node_id in wave), return_exceptions=True)
+                failure: BaseException | None = None
+                for node_id, result in zip(wave, results):
+                    if isinstance(result, BaseException):
+                        failure = failure or result
+                    elif result is not None:
+                        outputs[node_id] = result
+                # Let the whole wave settle, then stop before any dependant runs
+                if failure is not None:
+                    raise failure
+
+            # Flush logs before the run is marked finished so readers see the complete log
+            await log_listener.stop()
+            await _mark_run_succeeded(session, run.id, await _outputs_for_storage(gcs, run.id, outputs), now=datetime.utcnow())
             await session.commit()
+            events.publish(run.id)
         except Exception:
-            await _mark_run_failed(session, run.id, outputs)
+            await log_listener.stop()
+            await _mark_run_failed(session, run.id, await _outputs_for_storage(gcs, run.id, outputs), now=datetime.utcnow())
             await session.commit()
+            events.publish(run.id)
         finally:
-            await http_client.aclose()
+            await log_listener.stop()
+
+
+@dataclass(frozen=True)
+class _PreparedGraph:
+    """A validated graph plus its execution plan; shared between runs, so treat as read-only."""
+
+    graph: Graph
+    levels: List[List[str]]
+    nodes_by_id: Dict[str, Node]
+    parents_map: Dict[str, List[str]]
+    tool_children: Dict[str, List[str]]
+    # "tool", "agent" or "other" per node id, from the node type prefix
+    node_category: Dict[str, str]
+
+
+def _prepare_graph(workflow_id: int, graph_json: Dict[str, Any]) -> _PreparedGraph:
+    # Keyed by content so an edited workflow gets a fresh entry rather than a stale plan
+    key = (workflow_id, blake2b(_canonical_json(graph_json), digest_size=16).hexdigest())
+    prepared = _GRAPH_CACHE.get(key)
+    if prepared is not None:
+        _GRAPH_CACHE.move_to_end(key)
+        return prepared
+
+    # Stored graphs were validated on write; _analyze still rejects cycles
+    graph = Graph.from_trusted(graph_json)
+    levels, parents_map, _, tool_children = graph._analyze()
+    prepared = _PreparedGraph(
+        graph=graph,
+        levels=levels,
+        nodes_by_id={n.id: n for n in graph.nodes},
+        parents_map=parents_map,
+        tool_children=tool_children,
+        node_category={n.id: _node_category(n.type) for n in graph.nodes},
+    )
+    _GRAPH_CACHE[key] = prepared
+    if len(_GRAPH_CACHE) > _GRAPH_CACHE_SIZE:
+        _GRAPH_CACHE.popitem(last=False)
+    return prepared
+
+
+def _node_category(node_type: str) -> str:
+    node_type = str(node_type)
+    if node_type.startswith("tool."):
+        return "tool"
+    if node_type.startswith("agent."):
+        return "agent"
+    return "other"
 
 
 async def _load_run_with_workflow(session: AsyncSession, run_id: int) -> Run | None:
-    stmt = select(Run).where(Run.id == run_id).options()
+    # Join the workflow into the same SELECT instead of a follow-up refresh
+    stmt = select(Run).where(Run.id == run_id).options(joinedload(Run.workflow))
     result = await session.execute(stmt)
-    run = result.scalar_one_or_none()
-    if run is None:
-        return None
-    # explicit load workflow
-    await session.refresh(run, attribute_names=["workflow"])
-    return run
+    return result.scalar_one_or_none()
 
 
-async def _mark_run_running(session: AsyncSession, run_id: int) -> None:
+async def _mark_run_running(session: AsyncSession, run_id: int, *, now: datetime) -> None:
+    await session.execute(
+        update(Run).where(Run.id == run_id).values(status="running", started_at=now)
+    )
+    await notify_run_event(session, run_id)
+
+
+async def _outputs_for_storage(gcs: GCSWriter, run_id: int, outputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Return what to store in runs.outputs_json: the outputs, or a GCS pointer when they are large."""
+    if not gcs.enabled:
+        return outputs
+    try:
+        blob = orjson.dumps(outputs, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return outputs
+    if len(blob) <= _OUTPUTS_SPILL_BYTES:
+        return outputs
+    try:
+        uri = await asyncio.to_thread(gcs.write_bytes, f"runs/{run_id}/outputs.json", blob, "application/json")
+    except Exception:
+        # Keeping the outputs inline beats losing them
+        _log.warning("failed to spill outputs of run %s to GCS; storing inline", run_id, exc_info=True)
+        return outputs
+    return {OUTPUTS_GCS_KEY: uri}
+
+
+async def _mark_run_succeeded(session: AsyncSession, run_id: int, outputs: Dict[str, Any], *, now: datetime) -> None:
     await session.execute(
-        update(Run).where(Run.id == run_id).values(status="running", started_at=datetime.utcnow())
+        update(Run).where(Run.id == run_id).values(status="succeeded", finished_at=now, outputs_json=outputs)
     )
+    await notify_run_event(session, run_id)
 
 
-async def _mark_run_succeeded(session: AsyncSession, run_id: int, outputs: Dict[str, Any]) -> None:
+async def _mark_run_failed(session: AsyncSession, run_id: int, outputs: Dict[str, Any], *, now: datetime) -> None:
     await session.execute(
-        update(Run).where(Run.id == run_id).values(status="succeeded", finished_at=datetime.utcnow(), outputs_json=outputs)
+        update(Run).where(Run.id == run_id).values(status="failed", finished_at=now, outputs_json=outputs)
     )
+    await notify_run_event(session, run_id)
+
+
+async def _mark_node_status(session: AsyncSession, run_id: int, nodes: List[Tuple[str, str]], *, status: str, now: datetime) -> Dict[str, int]:
+    """Insert one row per (node_id, node_type) in a single statement and return their ids by node id."""
+    started_at = now if status == "running" else None
+    result = await session.execute(
+        insert(NodeRun).returning(NodeRun.node_id, NodeRun.id, sort_by_parameter_order=True),
+        [
+            {"run_id": run_id, "node_id": node_id, "node_type": node_type, "status": status, "started_at": started_at}
+            for node_id, node_type in nodes
+        ],
+    )
+    return {node_id: node_run_id for node_id, node_run_id in result.all()}
 
 
-async def _mark_run_failed(session: AsyncSession, run_id: int, outputs: Dict[str, Any]) -> None:
+async def _persist_node_success(session: AsyncSession, node_run_id: int, input_payload: Dict[str, Any], output_payload: Dict[str, Any], *, now: datetime) -> None:
     await session.execute(
-        update(Run).where(Run.id == run_id).values(status="failed", finished_at=datetime.utcnow(), outputs_json=outputs)
+        update(NodeRun)
+        .where(NodeRun.id == node_run_id)
+        .values(status="succeeded", finished_at=now, input_json=input_payload, output_json=output_payload)
     )
 
 
-async def _mark_node_status(session: AsyncSession, run_id: int, node_id: str, node_type: str, *, status: str) -> None:
+async def _persist_node_error(session: AsyncSession, node_run_id: int, input_payload: Dict[str, Any], ex: Exception, *, now: datetime) -> None:
     await session.execute(
-        insert(NodeRun).values(
-            run_id=run_id, node_id=node_id, node_type=node_type, status=status, started_at=datetime.utcnow() if status == "running" else None
-        )
+        update(NodeRun)
+        .where(NodeRun.id == node_run_id)
+        .values(status="failed", finished_at=now, input_json=input_payload, error_json={"message": str(ex)})
     )
 
 
-async def _persist_node_success(session: AsyncSession, run_id: int, node_id: str, node_type: str, input_payload: Dict[str, Any], output_payload: Dict[str, Any]) -> None:
-    from sqlalchemy import update
-
+async def _persist_node_cached(session: AsyncSession, node_run_id: int, input_payload: Dict[str, Any], output_payload: Dict[str, Any], *, now: datetime) -> None:
     await session.execute(
         update(NodeRun)
-        .where(NodeRun.run_id == run_id, NodeRun.node_id == node_id)
-        .values(status="succeeded", finished_at=datetime.utcnow(), input_json=input_payload, output_json=output_payload)
+        .where(NodeRun.id == node_run_id)
+        .values(status="cached_hit", finished_at=now, input_json=input_payload, output_json=output_payload)
     )
 
 
-async def _persist_node_error(session: AsyncSession, run_id: int, node_id: str, node_type: str, input_payload: Dict[str, Any], ex: Exception) -> None:
-    from sqlalchemy import update
+def _canonical_json(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
 
+def _digest(value: Any) -> Optional[str]:
+    """BLAKE2b of the canonical JSON form; None when the value isn't JSON-serialisable."""
+    try:
+        return blake2b(_canonical_json(value), digest_size=32).hexdigest()
+    except TypeError:
+        return None
+
+
+def _node_cache_key(node_type: str, node_input: Dict[str, Any], upstream_digests: List[tuple[str, Optional[str]]]) -> Optional[str]:
+    # Upstream outputs enter the key by digest, so large payloads are hashed once, not per dependant
+    if any(d is None for _, d in upstream_digests):
+        return None
+    return _digest({
+        "type": node_type,
+        "settings": node_input["settings"],
+        "upstream": upstream_digests,
+        "trigger": node_input["trigger"],
+        "user_id": node_input["user_id"],
+        "tools": node_input.get("__derived_tools_from_edges__"),
+    })
+
+
+def _node_cache_cutoff() -> Optional[datetime]:
+    ttl = settings.NODE_CACHE_TTL_SECONDS
+    return datetime.utcnow() - timedelta(seconds=ttl) if ttl > 0 else None
+
+
+async def _load_cached_output(session: AsyncSession, cache_key: str) -> Dict[str, Any] | None:
+    stmt = select(NodeCache.output_json).where(NodeCache.hash == cache_key)
+    cutoff = _node_cache_cutoff()
+    if cutoff is not None:
+        stmt = stmt.where(NodeCache.created_at >= cutoff)
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def _store_cached_output(session: AsyncSession, cache_key: str, node_type: str, output: Dict[str, Any]) -> None:
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = pg_insert(NodeCache)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(NodeCache)
+    else:
+        return
+    stmt = stmt.values(hash=cache_key, node_type=node_type, output_json=output, created_at=datetime.utcnow())
+    # An existing row is an expired entry or a concurrent node's identical result; either way, refresh it
     await session.execute(
-        update(NodeRun)
-        .where(NodeRun.run_id == run_id, NodeRun.node_id == node_id)
-        .values(status="failed", finished_at=datetime.utcnow(), input_json=input_payload, error_json={"message": str(ex)})
+        stmt.on_conflict_do_update(
+            index_elements=["hash"],
+            set_={"output_json": stmt.excluded.output_json, "created_at": stmt.excluded.created_at},
+        )
     )
+    await _prune_node_cache(session)
+
+
+async def _prune_node_cache(session: AsyncSession) -> None:
+    global _node_cache_next_prune
+    cutoff = _node_cache_cutoff()
+    if cutoff is None or time.monotonic() < _node_cache_next_prune:
+        return
+    _node_cache_next_prune = time.monotonic() + _NODE_CACHE_PRUNE_INTERVAL_SECONDS
+    await session.execute(delete(NodeCache).where(NodeCache.created_at < cutoff))
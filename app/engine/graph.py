@@ -9,6 +9,11 @@ def toposort(graph: Graph) -> List[str]:
     return graph._toposort()
 
 
+def toposort_levels(graph: Graph) -> List[List[str]]:
+    """Topological levels; nodes within a level never depend on each other."""
+    return graph._analyze()[0]
+
+
 def build_parent_child_maps(graph: Graph) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
     parents: Dict[str, List[str]] = {n.id: [] for n in graph.nodes}
     children: Dict[str, List[str]] = {n.id: [] for n in graph.nodes}
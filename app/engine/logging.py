@@ -1,15 +1,168 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from sqlalchemy import insert
+import orjson
+from sqlalchemy import func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db.models import Log
+from ..db.models import Log, LogEventType
+from . import events
+
+
+_LOG_BATCH_SIZE = 256
+# Bounds memory if a run logs faster than the database absorbs; overflow rows are dropped
+_LOG_QUEUE_MAXSIZE = 10000
+# Below this, COPY's per-call setup costs more than a multi-row INSERT saves
+_COPY_MIN_ROWS = 32
+_COPY_COLUMNS = ["run_id", "node_id", "ts", "level", "message", "data_json", "event_type"]
+
+# Postgres NOTIFY channel; the payload is the run id whose logs or status changed
+RUN_EVENTS_CHANNEL = "run_events"
+
+_log = logging.getLogger("engine.logging")
 
 
 async def insert_log(session: AsyncSession, run_id: int, message: str, *, node_id: Optional[str] = None, level: str = "info", data: Optional[Dict[str, Any]] = None) -> None:
     stmt = insert(Log).values(run_id=run_id, node_id=node_id, level=level, message=message, data_json=data or {})
+    # No commit: the caller owns the transaction boundary
     await session.execute(stmt)
-    # Commit immediately so streaming clients in a separate session can see the log
-    await session.commit()
+
+
+async def notify_run_event(session: AsyncSession, run_id: int) -> None:
+    """Wake `/runs/{id}/events` listeners once the caller's transaction commits. No-op off Postgres."""
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    await session.execute(select(func.pg_notify(RUN_EVENTS_CHANNEL, str(run_id))))
+
+
+class AsyncLogListener:
+    """Queue-backed log writer: producers enqueue rows, one background task inserts them in batches.
+
+    `enqueue` never touches the database, so block code does not wait on a round-trip per log line.
+    `stop` drains whatever is still queued before returning, unless the queue is full or the writer has died.
+    """
+
+    def __init__(self, SessionFactory) -> None:
+        self._session_factory = SessionFactory
+        self._queue: asyncio.Queue[Optional[Dict[str, Any]]] = asyncio.Queue(maxsize=_LOG_QUEUE_MAXSIZE)
+        self._task: Optional[asyncio.Task[None]] = None
+        self._dropped = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+
+    def enqueue(
+        self,
+        run_id: int,
+        message: str,
+        *,
+        node_id: Optional[str] = None,
+        level: str = "info",
+        data: Optional[Dict[str, Any]] = None,
+        ts: Optional[datetime] = None,
+        event_type: LogEventType = LogEventType.log,
+    ) -> None:
+        if self._queue.full():
+            # Never make a node wait on logging; count the loss and report it once at stop
+            self._dropped += 1
+            return
+        # Stamp now rather than at flush time so ordering by ts reflects when the log happened
+        self._queue.put_nowait({
+            "run_id": run_id,
+            "node_id": node_id,
+            "level": level,
+            "message": message,
+            "data_json": data or {},
+            "ts": ts or datetime.utcnow(),
+            "event_type": event_type,
+        })
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        if not task.done():
+            try:
+                self._queue.put_nowait(None)
+            except asyncio.QueueFull:
+                # Waiting for room could hang the run on a stalled writer; give up on the backlog instead
+                _log.warning("log queue full at stop; discarding %d unwritten rows", self._queue.qsize())
+                task.cancel()
+        # Logs are best-effort: a writer that died or was cancelled must not fail the run
+        (result,) = await asyncio.gather(task, return_exceptions=True)
+        if isinstance(result, Exception):
+            _log.error("log writer task failed", exc_info=result)
+        if self._dropped:
+            _log.warning("dropped %d log rows: queue was full", self._dropped)
+            self._dropped = 0
+
+    async def _drain(self) -> None:
+        async with self._session_factory() as session:  # type: AsyncSession
+            stopping = False
+            while not stopping:
+                batch: List[Dict[str, Any]] = []
+                item = await self._queue.get()
+                while True:
+                    if item is None:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                    if len(batch) >= _LOG_BATCH_SIZE or self._queue.empty():
+                        break
+                    item = self._queue.get_nowait()
+                if not batch:
+                    continue
+                run_ids = {r["run_id"] for r in batch}
+                try:
+                    await _write_batch(session, batch)
+                    for run_id in run_ids:
+                        await notify_run_event(session, run_id)
+                    # Commit per batch so streaming clients in a separate session can see the logs
+                    await session.commit()
+                    for run_id in run_ids:
+                        events.publish(run_id)
+                except Exception:
+                    # Logs are best-effort; a failed batch must not take down the run
+                    _log.exception("failed to write %d log rows", len(batch))
+                    try:
+                        await session.rollback()
+                    except Exception:
+                        # e.g. a dropped connection; the next batch starts on a fresh one
+                        _log.warning("rollback after failed log batch failed", exc_info=True)
+
+
+async def _write_batch(session: AsyncSession, batch: List[Dict[str, Any]]) -> None:
+    if len(batch) >= _COPY_MIN_ROWS and session.get_bind().dialect.name == "postgresql":
+        try:
+            await _copy_batch(session, batch)
+            return
+        except Exception:
+            _log.warning("COPY into logs failed; falling back to INSERT", exc_info=True)
+            await session.rollback()
+    await session.execute(insert(Log), batch)
+
+
+async def _copy_batch(session: AsyncSession, batch: List[Dict[str, Any]]) -> None:
+    """Bulk-load rows with asyncpg's binary COPY on the session's connection and transaction."""
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    records = [
+        (
+            r["run_id"],
+            r["node_id"],
+            r["ts"],
+            r["level"],
+            r["message"],
+            # The json codec on SQLAlchemy's asyncpg connections encodes from str
+            orjson.dumps(r["data_json"], option=orjson.OPT_NON_STR_KEYS).decode(),
+            # Enum columns store the member name, which for LogEventType is also its value
+            r["event_type"].name,
+        )
+        for r in batch
+    ]
+    await raw.driver_connection.copy_records_to_table(Log.__tablename__, records=records, columns=_COPY_COLUMNS)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Optional
+
+from ..db.session import engine
+from . import events
+from .logging import RUN_EVENTS_CHANNEL
+
+
+_log = logging.getLogger("engine.notifications")
+
+# Wait before reconnecting a lost LISTEN connection; streams keep re-checking on their own meanwhile
+_RECONNECT_DELAY_SECONDS = 5.0
+# How often an idle LISTEN connection is pinged, so a silently dropped one is noticed
+_PING_INTERVAL_SECONDS = 60.0
+
+
+def _on_notify(_conn: Any, _pid: int, _channel: str, payload: str) -> None:
+    try:
+        run_id = int(payload)
+    except ValueError:
+        return
+    events.publish(run_id)
+
+
+class RunEventListener:
+    """One Postgres LISTEN per process that turns run NOTIFYs from any process into `events` wakeups.
+
+    The connection is detached from the engine's pool, so it never holds one of the pooled slots
+    that requests and runs share. No-op off asyncpg, where only in-process wakeups exist.
+    """
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None and engine.dialect.driver == "asyncpg":
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except Exception:
+                _log.warning("run event LISTEN connection lost; reconnecting in %.0fs", _RECONNECT_DELAY_SECONDS, exc_info=True)
+            await asyncio.sleep(_RECONNECT_DELAY_SECONDS)
+
+    async def _listen(self) -> None:
+        conn = await engine.connect()
+        try:
+            raw = await conn.get_raw_connection()
+            listener = raw.driver_connection
+            # Closing `conn` now closes the driver connection instead of returning it to the pool
+            raw.detach()
+            closed = asyncio.Event()
+            listener.add_termination_listener(lambda _conn: closed.set())
+            await listener.add_listener(RUN_EVENTS_CHANNEL, _on_notify)
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), timeout=_PING_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    await listener.execute("SELECT 1", timeout=_RECONNECT_DELAY_SECONDS)
+        finally:
+            await conn.close()
+
+
+run_event_listener = RunEventListener()
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from fastapi import BackgroundTasks
-from sqlalchemy import insert, select
+from sqlalchemy import JSON, String, insert, literal, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db.models import Run, Workflow
 from ..db.session import SessionFactory
-from .executor import execute_run
+from .worker import run_workers
 
 
 async def create_and_start_run(
@@ -17,27 +16,73 @@ async def create_and_start_run(
     trigger_type: str = "manual",
     trigger_payload: Optional[Dict[str, Any]] = None,
     user_id: Optional[str] = None,
-    background_tasks: BackgroundTasks,
-) -> int:
-    async with SessionFactory() as session:  # type: AsyncSession
-        wf = await _get_workflow(session, workflow_id)
-        if wf is None:
-            raise ValueError("Workflow not found")
-        run_id = await _insert_run(session, workflow_id, trigger_type, trigger_payload, user_id)
-        await session.commit()
-
-    background_tasks.add_task(execute_run, run_id, SessionFactory, None)
+) -> Optional[int]:
+    """Start a run of a workflow; None when it does not exist or, given user_id, belongs to another user."""
+    # Raises RunQueueFull before any row is written when too many runs are already waiting
+    run_workers.admit()
+    try:
+        async with SessionFactory() as session:  # type: AsyncSession
+            where = [Workflow.id == workflow_id]
+            if user_id is not None:
+                # Unowned workflows can be run by anyone signed in
+                where.append(or_(Workflow.user_id.is_(None), Workflow.user_id == "", Workflow.user_id == user_id))
+            run_id = await _insert_run_from_workflow(session, where, trigger_type, trigger_payload, user_id)
+            if run_id is not None:
+                await session.commit()
+    except BaseException:
+        run_workers.release()
+        raise
+    if run_id is None:
+        run_workers.release()
+        return None
+
+    run_workers.submit(run_id)
     return run_id
 
 
-async def _get_workflow(session: AsyncSession, workflow_id: int) -> Workflow | None:
-    stmt = select(Workflow).where(Workflow.id == workflow_id)
-    result = await session.execute(stmt)
-    return result.scalar_one_or_none()
+async def create_and_start_run_by_slug(
+    webhook_slug: str,
+    *,
+    trigger_type: str = "webhook",
+    trigger_payload: Optional[Dict[str, Any]] = None,
+) -> Optional[int]:
+    """Start a run of the workflow behind a webhook slug; None when no workflow has that slug."""
+    run_workers.admit()
+    try:
+        async with SessionFactory() as session:  # type: AsyncSession
+            run_id = await _insert_run_from_workflow(session, [Workflow.webhook_slug == webhook_slug], trigger_type, trigger_payload)
+            if run_id is not None:
+                await session.commit()
+    except BaseException:
+        run_workers.release()
+        raise
+    if run_id is None:
+        run_workers.release()
+        return None
+
+    run_workers.submit(run_id)
+    return run_id
 
 
-async def _insert_run(session: AsyncSession, workflow_id: int, trigger_type: str, trigger_payload: Optional[Dict[str, Any]], user_id: Optional[str]) -> int:
-    stmt = insert(Run).values(workflow_id=workflow_id, user_id=user_id, trigger_type=trigger_type, trigger_payload_json=trigger_payload or {})
+async def _insert_run_from_workflow(
+    session: AsyncSession,
+    where: List[Any],
+    trigger_type: str,
+    trigger_payload: Optional[Dict[str, Any]],
+    user_id: Optional[str] = None,
+) -> Optional[int]:
+    # INSERT ... SELECT finds the workflow and creates the run in one round trip; no match inserts nothing
+    source = select(
+        Workflow.id,
+        literal(user_id, String),
+        literal(trigger_type),
+        literal(trigger_payload or {}, JSON),
+    ).where(*where)
+    stmt = (
+        insert(Run)
+        .from_select(["workflow_id", "user_id", "trigger_type", "trigger_payload_json"], source)
+        .returning(Run.id)
+    )
     result = await session.execute(stmt)
-    run_id = result.inserted_primary_key[0]
-    return int(run_id)
+    run_id = result.scalar_one_or_none()
+    return int(run_id) if run_id is not None else None
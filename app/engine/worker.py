@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import List, Optional
+
+from ..db.session import SessionFactory
+from ..server.settings import settings
+from .executor import execute_run
+
+
+_log = logging.getLogger("engine.worker")
+
+
+class RunQueueFull(RuntimeError):
+    """Raised by `RunWorkerPool.admit` when `max_pending` runs are already waiting."""
+
+
+class RunWorkerPool:
+    """Fixed set of worker tasks that execute queued runs off the request path.
+
+    Producers call `submit` and return immediately; at most `concurrency` runs execute at once,
+    the rest wait in the queue in submission order. Producers `admit` a run before creating it,
+    so at most `max_pending` runs are ever waiting and overload is refused up front.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int) -> None:
+        self._concurrency = max(1, concurrency)
+        self._max_pending = max(1, max_pending)
+        # Admitted runs not yet picked up by a worker, including ones still being created
+        self._pending = 0
+        self._queue: Optional[asyncio.Queue[Optional[int]]] = None
+        self._workers: List[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        # Created here rather than in __init__ so the queue binds to the serving event loop
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._concurrency)]
+
+    def admit(self) -> None:
+        """Reserve a queue slot for a run about to be created; pair with `submit` or `release`."""
+        if self._pending >= self._max_pending:
+            raise RunQueueFull(f"{self._pending} runs already waiting")
+        self._pending += 1
+
+    def release(self) -> None:
+        """Give back a slot from `admit` when the run was not created after all."""
+        self._pending -= 1
+
+    def submit(self, run_id: int) -> None:
+        self.start()
+        assert self._queue is not None
+        self._queue.put_nowait(run_id)
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        if not workers or self._queue is None:
+            return
+        # Sentinels queue behind pending runs, so already-accepted runs still finish
+        for _ in workers:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queue = None
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            run_id = await queue.get()
+            if run_id is None:
+                return
+            self._pending -= 1
+            try:
+                await execute_run(run_id, SessionFactory, None)
+            except Exception:
+                # execute_run records the failure on the run; keep the worker alive for the next one
+                _log.exception("run %s failed", run_id)
+
+
+run_workers = RunWorkerPool(settings.MAX_CONCURRENT_RUNS, settings.MAX_PENDING_RUNS)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field, model_validator
 
@@ -30,6 +31,20 @@ class Edge(BaseModel):
 class Graph(BaseModel):
     nodes: List[Node]
     edges: List[Edge]
+    memoize: bool = Field(default=False, description="Reuse a node's stored output when its type, settings, inputs and trigger match a previous run")
+
+    @classmethod
+    def from_trusted(cls, data: Dict) -> "Graph":
+        """Build a graph without validation, for graph JSON that was already validated when it was stored."""
+        nodes = [Node.model_construct(**n) for n in data.get("nodes", [])]
+        edges = []
+        for e in data.get("edges", []):
+            fields = dict(e)
+            # model_construct takes field names, not the "from" alias
+            if "from" in fields:
+                fields["from_node"] = fields.pop("from")
+            edges.append(Edge.model_construct(**fields))
+        return cls.model_construct(nodes=nodes, edges=edges, memoize=bool(data.get("memoize", False)))
 
     @model_validator(mode="after")
     def _validate_graph(self) -> "Graph":
@@ -53,10 +68,10 @@ class Graph(BaseModel):
                 continue
             children[e.from_node].append(e.to)
             indeg[e.to] += 1
-        queue = [nid for nid, d in indeg.items() if d == 0]
+        queue = deque(nid for nid, d in indeg.items() if d == 0)
         order: List[str] = []
         while queue:
-            nid = queue.pop(0)
+            nid = queue.popleft()
             order.append(nid)
             for c in children[nid]:
                 indeg[c] -= 1
@@ -65,3 +80,34 @@ class Graph(BaseModel):
         if len(order) != len(self.nodes):
             raise ValueError("Graph contains a cycle")
         return order
+
+    def _analyze(self) -> Tuple[List[List[str]], Dict[str, List[str]], Dict[str, List[str]], Dict[str, List[str]]]:
+        """One pass over edges giving topological levels, parents, children and tool children per agent."""
+        parents: Dict[str, List[str]] = {n.id: [] for n in self.nodes}
+        children: Dict[str, List[str]] = {n.id: [] for n in self.nodes}
+        indeg: Dict[str, int] = {n.id: 0 for n in self.nodes}
+        tool_children: Dict[str, List[str]] = {}
+        for e in self.edges:
+            if getattr(e, "kind", "control") == "tool":
+                tool_children.setdefault(e.from_node, []).append(e.to)
+                continue
+            parents[e.to].append(e.from_node)
+            children[e.from_node].append(e.to)
+            indeg[e.to] += 1
+        # Kahn's algorithm one level at a time; nodes within a level never depend on each other
+        levels: List[List[str]] = []
+        level = [nid for nid, d in indeg.items() if d == 0]
+        seen = 0
+        while level:
+            levels.append(level)
+            seen += len(level)
+            next_level: List[str] = []
+            for nid in level:
+                for c in children[nid]:
+                    indeg[c] -= 1
+                    if indeg[c] == 0:
+                        next_level.append(c)
+            level = next_level
+        if seen != len(self.nodes):
+            raise ValueError("Graph contains a cycle")
+        return levels, parents, children, tool_children
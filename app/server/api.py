@@ -1,31 +1,37 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
-from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from functools import lru_cache
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
-from sqlalchemy import insert, select, update
+from sqlalchemy import bindparam, case, delete, insert, null, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import blocks  # noqa: F401 — ensure registry is populated
-from ..blocks.registry import list_blocks, list_block_specs
-from ..db.models import Log, Run, Workflow, RunStatusEnum, NodeRun, ComposioAccount
+from ..blocks.registry import block_count, get_block_class, list_blocks, list_block_specs
+from ..db.models import Log, LogEventType, Run, Workflow, RunStatusEnum, NodeRun, ComposioAccount
 from ..db.session import SessionFactory
 from ..engine.graph import toposort
 from ..schemas.graph import Graph
 from ..schemas.run import RunCreate
-from ..engine.orchestrator import create_and_start_run
+from ..engine import events
+from ..engine.executor import OUTPUTS_GCS_KEY
+from ..engine.orchestrator import create_and_start_run, create_and_start_run_by_slug
+from ..engine.worker import RunQueueFull
 from ..server.settings import settings
 from ..services.assistant import create_workflow_from_prompt, stream_graph_from_prompt
 from ..services.composio import get_composio_client
-from starlette.responses import StreamingResponse, RedirectResponse
+from ..services.gcs import GCSWriter
+from starlette.responses import Response, StreamingResponse, RedirectResponse
 import asyncio
-import json
+import hashlib
 import secrets
 import re
 
+import orjson
+
 router = APIRouter()
 auth_scheme_optional = HTTPBearer(auto_error=False)
 auth_scheme_required = HTTPBearer(auto_error=True)
@@ -36,9 +42,30 @@ async def get_session() -> AsyncSession:
         yield session
 
 
+def _json_response(payload: Any) -> Response:
+    # orjson writes datetimes and enums itself, so list handlers can pass column values straight through
+    return Response(content=orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS), media_type="application/json")
+
+
+_SSE_DATA = b"data: "
+_SSE_END = b"\n\n"
+# Comment frame: keeps proxies from closing an idle stream and is ignored by SSE clients
+_SSE_KEEPALIVE = b": keepalive\n\n"
+# Stop proxies (nginx in particular) from buffering or caching the event stream
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(payload: Dict[str, Any]) -> bytes:
+    return _SSE_DATA + orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS) + _SSE_END
+
+
+# Settings are read once from the environment at startup, so derive these once too
+_JWT_SECRET: Optional[bytes] = settings.SUPABASE_JWT_SECRET.encode("utf-8") if settings.SUPABASE_JWT_SECRET else None
+
+
 def _current_user_id(request: Request) -> str:
     # Supabase JWT (HS256). If missing/invalid, fallback to system-user.
-    import base64, json as _json, hmac, hashlib
+    import base64, hmac, hashlib
     auth = request.headers.get("authorization") or request.headers.get("Authorization")
     token = None
     if auth and auth.lower().startswith("bearer "):
@@ -50,14 +77,13 @@ def _current_user_id(request: Request) -> str:
         def _b64url_decode(s: str) -> bytes:
             s += "=" * (-len(s) % 4)
             return base64.urlsafe_b64decode(s.encode("utf-8"))
-        secret = settings.SUPABASE_JWT_SECRET
-        if secret:
+        if _JWT_SECRET:
             signing_input = f"{header_b64}.{payload_b64}".encode("utf-8")
-            expected = hmac.new(secret.encode("utf-8"), signing_input, hashlib.sha256).digest()
+            expected = hmac.new(_JWT_SECRET, signing_input, hashlib.sha256).digest()
             sig = _b64url_decode(sig_b64)
             if not hmac.compare_digest(expected, sig):
                 return "system-user"
-        payload = _json.loads(_b64url_decode(payload_b64).decode("utf-8"))
+        payload = orjson.loads(_b64url_decode(payload_b64))
         sub = str(payload.get("sub") or payload.get("user_id") or "").strip()
         return sub or "system-user"
     except Exception:
@@ -66,22 +92,21 @@ def _current_user_id(request: Request) -> str:
 
 async def require_user(request: Request, creds: HTTPAuthorizationCredentials = Depends(auth_scheme_required)) -> str:
     # Enforce presence and validity of Supabase JWT
-    import base64, json as _json, hmac, hashlib
+    import base64, hmac, hashlib
     token = creds.credentials
     try:
         header_b64, payload_b64, sig_b64 = token.split(".")
         def _b64url_decode(s: str) -> bytes:
             s += "=" * (-len(s) % 4)
             return base64.urlsafe_b64decode(s.encode("utf-8"))
-        secret = settings.SUPABASE_JWT_SECRET
-        if not secret:
+        if not _JWT_SECRET:
             raise HTTPException(status_code=401, detail="Auth not configured")
         signing_input = f"{header_b64}.{payload_b64}".encode("utf-8")
-        expected = hmac.new(secret.encode("utf-8"), signing_input, hashlib.sha256).digest()
+        expected = hmac.new(_JWT_SECRET, signing_input, hashlib.sha256).digest()
         sig = _b64url_decode(sig_b64)
         if not hmac.compare_digest(expected, sig):
             raise HTTPException(status_code=401, detail="Invalid token")
-        payload = _json.loads(_b64url_decode(payload_b64).decode("utf-8"))
+        payload = orjson.loads(_b64url_decode(payload_b64))
         sub = str(payload.get("sub") or payload.get("user_id") or "").strip()
         if not sub:
             raise HTTPException(status_code=401, detail="Invalid token payload")
@@ -94,17 +119,17 @@ async def require_user(request: Request, creds: HTTPAuthorizationCredentials = D
 
 def _sign_state(data: Dict[str, Any]) -> str:
     # Minimal opaque token; TODO: HMAC sign
-    return json.dumps(data)
+    return orjson.dumps(data).decode()
 
 
 def _parse_state(state: str) -> Dict[str, Any]:
     try:
-        return json.loads(state)
+        return orjson.loads(state)
     except Exception:
         return {}
 
 
-def _frontend_base_url() -> str:
+def _resolve_frontend_base_url() -> str:
     # Prefer explicit env
     if settings.FRONTEND_BASE_URL:
         return settings.FRONTEND_BASE_URL.rstrip("/")
@@ -115,6 +140,13 @@ def _frontend_base_url() -> str:
     return "http://localhost:5173"
 
 
+_FRONTEND_BASE_URL = _resolve_frontend_base_url()
+
+
+def _frontend_base_url() -> str:
+    return _FRONTEND_BASE_URL
+
+
 class WorkflowCreate(BaseModel):
     name: str
     description: Optional[str] = None
@@ -129,25 +161,24 @@ class WorkflowUpdate(BaseModel):
     graph: Optional[Graph] = None
 
 
-def _validate_and_normalize_agent_tools(graph: Graph) -> Dict[str, Any]:
-    from ..blocks.registry import get_block_class
+# Resolved once per tool type and registry size: blocks only ever get added, so a new count means stale entries
+@lru_cache(maxsize=512)
+def _tool_type_info(type_name: str, registry_size: int) -> Tuple[Optional[type], bool, Optional[type]]:
+    """(block class, tool compatible, settings model) for a tool type."""
+    cls = get_block_class(type_name)
+    if cls is None:
+        return None, False, None
+    compatible = bool(getattr(cls, "tool_compatible", False)) or type_name.startswith("tool.")
+    if not compatible:
+        extras = cls.extras() if hasattr(cls, "extras") and callable(getattr(cls, "extras")) else None
+        compatible = isinstance(extras, dict) and extras.get("toolCompatible") is True
+    return cls, compatible, getattr(cls, "settings_model", None)
+
 
+def _validate_and_normalize_agent_tools(graph: Graph) -> Dict[str, Any]:
     # Work on a plain dict for mutation
     gdict: Dict[str, Any] = graph.model_dump(by_alias=True)
-
-    # Build quick lookup for tool compatibility
-    def is_tool_compatible(type_name: str) -> bool:
-        cls = get_block_class(type_name)
-        if cls is None:
-            return False
-        if getattr(cls, "tool_compatible", False):
-            return True
-        if type_name.startswith("tool."):
-            return True
-        extras = cls.extras() if hasattr(cls, "extras") and callable(getattr(cls, "extras")) else None
-        if isinstance(extras, dict) and extras.get("toolCompatible") is True:
-            return True
-        return False
+    registry_size = block_count()
 
     # Validate each agent node
     for node in gdict.get("nodes", []):
@@ -172,13 +203,12 @@ def _validate_and_normalize_agent_tools(graph: Graph) -> Dict[str, Any]:
             seen.add(tname)
             if not ttype or not isinstance(ttype, str):
                 raise HTTPException(status_code=400, detail=f"Agent node {node.get('id')}: tool '{tname}' missing valid 'type'")
-            if not is_tool_compatible(ttype):
+            tcls, compatible, Model = _tool_type_info(ttype, registry_size)
+            if not compatible:
                 raise HTTPException(status_code=400, detail=f"Agent node {node.get('id')}: tool '{tname}' type '{ttype}' is not recognized as tool-compatible")
             # Validate settings against tool schema if available
-            tcls = get_block_class(ttype)
             if tcls is None:
                 raise HTTPException(status_code=400, detail=f"Agent node {node.get('id')}: unknown tool type '{ttype}'")
-            Model = getattr(tcls, "settings_model", None)
             if Model is not None:
                 try:
                     validated = Model.model_validate(tsettings)
@@ -193,18 +223,33 @@ def _validate_and_normalize_agent_tools(graph: Graph) -> Dict[str, Any]:
     return gdict
 
 
+# Below this many nodes the dump and checks take less time than handing them to a thread
+_NORMALIZE_IN_THREAD_MIN_NODES = 8
+
+
+async def _normalize_graph(graph: Graph) -> Dict[str, Any]:
+    """`_validate_and_normalize_agent_tools`, run off the event loop for large graphs."""
+    if len(graph.nodes) < _NORMALIZE_IN_THREAD_MIN_NODES:
+        return _validate_and_normalize_agent_tools(graph)
+    return await asyncio.to_thread(_validate_and_normalize_agent_tools, graph)
+
+
+_JSON_FENCE_RE = re.compile(r"```json\s*([\s\S]*?)```", re.IGNORECASE)
+
+
 def _extract_json_object(text: str) -> Dict[str, Any]:
-    # Try direct JSON first
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
+    # Try direct JSON first, unless the text opens with a code fence and so cannot parse
+    if not text.lstrip().startswith("```"):
+        try:
+            return orjson.loads(text)
+        except Exception:
+            pass
     # Try code fence ```json ... ```
-    fence = re.search(r"```json\s*([\s\S]*?)```", text, re.IGNORECASE)
+    fence = _JSON_FENCE_RE.search(text)
     if fence:
         candidate = fence.group(1).strip()
         try:
-            return json.loads(candidate)
+            return orjson.loads(candidate)
         except Exception:
             pass
     # Try first balanced brace substring
@@ -213,7 +258,7 @@ def _extract_json_object(text: str) -> Dict[str, Any]:
     if start != -1 and end != -1 and end > start:
         candidate = text[start : end + 1]
         try:
-            return json.loads(candidate)
+            return orjson.loads(candidate)
         except Exception:
             pass
     raise ValueError("Unable to extract JSON graph from model output")
@@ -241,29 +286,43 @@ async def assistant_new_stream(body: AssistantNewBody, session: AsyncSession = D
     async def event_gen():
         async for chunk in stream_graph_from_prompt(session, body.prompt, body.model, user_id=user_id):
             try:
-                yield f"data: {json.dumps(chunk)}\n\n"
+                yield _sse(chunk)
             except Exception:
-                yield f"data: {json.dumps({'type':'error','message':'serialization_failed'})}\n\n"
+                yield _sse({'type':'error','message':'serialization_failed'})
 
-    return StreamingResponse(event_gen(), media_type="text/event-stream")
+    return StreamingResponse(event_gen(), media_type="text/event-stream", headers=_SSE_HEADERS)
 
 
 @router.get("/workflows")
 async def list_workflows(session: AsyncSession = Depends(get_session), request: Request = None, _creds: HTTPAuthorizationCredentials | None = Depends(auth_scheme_optional)):
     uid = _current_user_id(request)
-    stmt = select(Workflow).where((Workflow.user_id == uid) | (Workflow.user_id.is_(None))).order_by(Workflow.id.asc())
+    stmt = (
+        select(Workflow.id, Workflow.name, Workflow.description, Workflow.webhook_slug, Workflow.created_at)
+        .where((Workflow.user_id == uid) | (Workflow.user_id.is_(None)))
+        .order_by(Workflow.id.asc())
+    )
     result = await session.execute(stmt)
-    rows = result.scalars().all()
-    return [
-        {
-            "id": w.id,
-            "name": w.name,
-            "description": (w.description or ""),
-            "webhook_slug": w.webhook_slug,
-            "created_at": w.created_at.isoformat(),
-        }
-        for w in rows
-    ]
+    return _json_response([
+        {"id": wid, "name": name, "description": (description or ""), "webhook_slug": webhook_slug, "created_at": created_at}
+        for wid, name, description, webhook_slug, created_at in result.all()
+    ])
+
+
+# Plain lookup instead of RunStatusEnum(status): no exception path, and clients keep getting 400 (not 422)
+_RUN_STATUSES: Dict[str, RunStatusEnum] = {s.value: s for s in RunStatusEnum}
+
+
+# Current node: the latest running node, else the latest started one if it has not finished.
+# Correlated to the outer Run, so a list gets every run's current node in the same query.
+_CURRENT_NODE_ID = (
+    select(case((NodeRun.finished_at.is_(None), NodeRun.node_id)))
+    .where(NodeRun.run_id == Run.id)
+    .order_by(case((NodeRun.status == "running", 0), else_=1), NodeRun.started_at.desc())
+    .limit(1)
+    .correlate(Run)
+    .scalar_subquery()
+    .label("current_node_id")
+)
 
 
 @router.get("/runs")
@@ -275,13 +334,15 @@ async def list_runs(
     session: AsyncSession = Depends(get_session),
     user_id: str = Depends(require_user),
 ):
-    stmt = select(Run).where((Run.user_id == user_id) | (Run.user_id.is_(None)))
+    stmt = (
+        select(Run.id, Run.workflow_id, Run.status, Run.started_at, Run.finished_at, Run.trigger_type, _CURRENT_NODE_ID)
+        .where((Run.user_id == user_id) | (Run.user_id.is_(None)))
+    )
     if workflow_id is not None:
         stmt = stmt.where(Run.workflow_id == workflow_id)
     if status is not None:
-        try:
-            status_enum = RunStatusEnum(status)
-        except Exception:
+        status_enum = _RUN_STATUSES.get(status)
+        if status_enum is None:
             raise HTTPException(status_code=400, detail="Invalid status")
         stmt = stmt.where(Run.status == status_enum)
     if before_id is not None:
@@ -295,53 +356,46 @@ async def list_runs(
         # Hard cap to avoid overly large queries
         page_size = min(limit, 100)
         result = await session.execute(stmt.limit(page_size + 1))
-        rows_all = result.scalars().all()
+        rows_all = result.all()
         rows = rows_all[:page_size]
         has_more = len(rows_all) > page_size
-        items = [
-            {
-                "id": r.id,
-                "workflow_id": r.workflow_id,
-                "status": r.status.value if hasattr(r.status, "value") else str(r.status),
-                "started_at": r.started_at.isoformat() if r.started_at else None,
-                "finished_at": r.finished_at.isoformat() if r.finished_at else None,
-                "trigger_type": r.trigger_type,
-            }
-            for r in rows
-        ]
         next_cursor = rows[-1].id if has_more and rows else None
-        return {"items": items, "next_cursor": next_cursor, "has_more": has_more}
+        return _json_response({"items": _run_list_items(rows), "next_cursor": next_cursor, "has_more": has_more})
 
     # Default: preserve legacy behavior returning a simple list
     result = await session.execute(stmt)
-    rows = result.scalars().all()
+    return _json_response(_run_list_items(result.all()))
+
+
+def _run_list_items(rows) -> list:
     return [
         {
-            "id": r.id,
-            "workflow_id": r.workflow_id,
-            "status": r.status.value if hasattr(r.status, "value") else str(r.status),
-            "started_at": r.started_at.isoformat() if r.started_at else None,
-            "finished_at": r.finished_at.isoformat() if r.finished_at else None,
-            "trigger_type": r.trigger_type,
+            "id": rid,
+            "workflow_id": workflow_id,
+            "status": status,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "trigger_type": trigger_type,
+            "current_node_id": current_node_id,
         }
-        for r in rows
+        for rid, workflow_id, status, started_at, finished_at, trigger_type, current_node_id in rows
     ]
 
 
 @router.post("/workflows")
 async def create_workflow(body: WorkflowCreate, session: AsyncSession = Depends(get_session), user_id: str = Depends(require_user)):
     # Validate/normalize agent tools per backend rules
-    gdict = _validate_and_normalize_agent_tools(body.graph)
+    gdict = await _normalize_graph(body.graph)
     stmt = insert(Workflow).values(
         name=body.name,
         description=body.description,
         webhook_slug=body.webhook_slug,
         graph_json=gdict,
         user_id=user_id,
-    )
-    result = await session.execute(stmt)
-    await session.commit()
-    return {"id": int(result.inserted_primary_key[0])}
+    ).returning(Workflow.id)
+    async with session.begin():
+        new_id = (await session.execute(stmt)).scalar_one()
+    return {"id": new_id}
 
 
 @router.get("/workflows/{workflow_id}")
@@ -354,25 +408,19 @@ async def get_workflow(workflow_id: int, session: AsyncSession = Depends(get_ses
     uid = _current_user_id(request)
     if wf.user_id and wf.user_id != uid:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return {
+    # graph_json can be large; orjson encodes it in one pass instead of jsonable_encoder walking it first
+    return _json_response({
         "id": wf.id,
         "name": wf.name,
         "description": wf.description,
         "webhook_slug": wf.webhook_slug,
         "graph": wf.graph_json,
-        "created_at": wf.created_at.isoformat(),
-    }
+        "created_at": wf.created_at,
+    })
 
 
 @router.put("/workflows/{workflow_id}")
 async def update_workflow(workflow_id: int, body: WorkflowUpdate, session: AsyncSession = Depends(get_session), user_id: str = Depends(require_user)):
-    # Ownership check
-    chk = await session.execute(select(Workflow).where(Workflow.id == workflow_id))
-    cur = chk.scalar_one_or_none()
-    if cur is None:
-        raise HTTPException(status_code=404, detail="Workflow not found")
-    if cur.user_id and cur.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
     values: Dict[str, Any] = {}
     if body.name is not None:
         values["name"] = body.name
@@ -381,28 +429,62 @@ async def update_workflow(workflow_id: int, body: WorkflowUpdate, session: Async
     if body.webhook_slug is not None:
         values["webhook_slug"] = body.webhook_slug
     if body.graph is not None:
-        values["graph_json"] = _validate_and_normalize_agent_tools(body.graph)
+        # Reject missing and foreign workflows before paying for (threaded) normalization;
+        # ending the read transaction frees the connection while the graph is normalized
+        await _check_workflow_writable(session, workflow_id, user_id)
+        await session.rollback()
+        values["graph_json"] = await _normalize_graph(body.graph)
 
     if not values:
+        await _check_workflow_writable(session, workflow_id, user_id)
         return {"updated": False}
 
-    await session.execute(update(Workflow).where(Workflow.id == workflow_id).values(**values))
-    await session.commit()
+    # Ownership is part of the WHERE clause, so the check and the write are one round trip
+    async with session.begin():
+        result = await session.execute(
+            update(Workflow)
+            .where(Workflow.id == workflow_id, _workflow_writable_by(user_id))
+            .values(**values)
+            .returning(Workflow.id)
+        )
+        if result.scalar_one_or_none() is None:
+            await _check_workflow_writable(session, workflow_id, user_id)
     return {"updated": True}
 
 
 @router.delete("/workflows/{workflow_id}")
 async def delete_workflow(workflow_id: int, session: AsyncSession = Depends(get_session), user_id: str = Depends(require_user)):
-    stmt = select(Workflow).where(Workflow.id == workflow_id)
-    result = await session.execute(stmt)
-    wf = result.scalar_one_or_none()
-    if wf is None:
+    # Core DELETE: runs and their rows go through the ON DELETE CASCADE foreign keys
+    async with session.begin():
+        result = await session.execute(
+            delete(Workflow).where(Workflow.id == workflow_id, _workflow_writable_by(user_id)).returning(Workflow.id)
+        )
+        if result.scalar_one_or_none() is None:
+            await _check_workflow_writable(session, workflow_id, user_id)
+            # Nothing was deleted by this request, e.g. a concurrent delete got there first
+            raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"deleted": True}
+
+
+def _workflow_writable_by(user_id: str):
+    # Global workflows (no owner) stay writable by any signed-in user
+    return or_(Workflow.user_id.is_(None), Workflow.user_id == "", Workflow.user_id == user_id)
+
+
+# Hot lookups are built once with bind parameters: SQLAlchemy memoizes a statement's cache key,
+# so repeat executions skip constructing the expression and go straight to the compiled SQL
+_WORKFLOW_OWNER = select(Workflow.user_id).where(Workflow.id == bindparam("workflow_id"))
+_RUN_OWNER = select(Run.user_id).where(Run.id == bindparam("run_id"))
+
+
+async def _check_workflow_writable(session: AsyncSession, workflow_id: int, user_id: str) -> None:
+    """Raise 404 or 403 unless the workflow exists and user_id may modify it."""
+    result = await session.execute(_WORKFLOW_OWNER, {"workflow_id": workflow_id})
+    row = result.first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    if wf.user_id and wf.user_id != user_id:
+    if row.user_id and row.user_id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
-    await session.delete(wf)
-    await session.commit()
-    return {"deleted": True}
 
 
 class ValidateGraphBody(BaseModel):
@@ -416,156 +498,250 @@ async def validate_graph(body: ValidateGraphBody):
 
 
 @router.post("/workflows/{workflow_id}/run")
-async def start_run(workflow_id: int, body: RunCreate | None = None, background_tasks: BackgroundTasks = None, user_id: str = Depends(require_user), session: AsyncSession = Depends(get_session)):
-    background_tasks = background_tasks or BackgroundTasks()
-    # Authorize: user must own the workflow, or it must be global (NULL user)
-    chk = await session.execute(select(Workflow).where(Workflow.id == workflow_id))
-    wf = chk.scalar_one_or_none()
-    if wf is None:
+async def start_run(workflow_id: int, body: RunCreate | None = None, user_id: str = Depends(require_user), session: AsyncSession = Depends(get_session)):
+    # Authorize inside the insert: the run is only created if the user owns the workflow or it is global
+    try:
+        run_id = await create_and_start_run(
+            workflow_id,
+            trigger_type="manual",
+            trigger_payload=(body.start_input if body else None) or {},
+            user_id=user_id,
+        )
+    except RunQueueFull:
+        raise HTTPException(status_code=503, detail="Too many runs queued; try again later")
+    if run_id is None:
+        # Nothing was inserted; only now look up why
+        await _check_workflow_writable(session, workflow_id, user_id)
         raise HTTPException(status_code=404, detail="Workflow not found")
-    if wf.user_id and wf.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    run_id = await create_and_start_run(
-        workflow_id,
-        trigger_type="manual",
-        trigger_payload=(body.start_input if body else None) or {},
-        user_id=user_id,
-        background_tasks=background_tasks,
-    )
     return {"id": run_id}
 
 
+_RUN_WITH_CURRENT_NODE = select(Run, _CURRENT_NODE_ID).where(Run.id == bindparam("run_id"))
+
+
 @router.get("/runs/{run_id}")
 async def get_run(run_id: int, session: AsyncSession = Depends(get_session), user_id: str = Depends(require_user)):
-    stmt = select(Run).where(Run.id == run_id)
-    result = await session.execute(stmt)
-    run = result.scalar_one_or_none()
-    if run is None:
+    result = await session.execute(_RUN_WITH_CURRENT_NODE, {"run_id": run_id})
+    row = result.first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Run not found")
+    run, current_node_id = row
     # authorize: either run.user_id matches, or legacy run attached via workflow
     if run.user_id and run.user_id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    current_node_id: Optional[str] = None
-    # Prefer running node if any; otherwise the most recently started node without finished_at
-    nr_stmt = (
-        select(NodeRun)
-        .where(NodeRun.run_id == run.id, NodeRun.status == "running")
-        .order_by(NodeRun.started_at.desc())
-        .limit(1)
-    )
-    nr_res = await session.execute(nr_stmt)
-    nr = nr_res.scalars().first()
-    if nr is None:
-        nr_stmt2 = (
-            select(NodeRun)
-            .where(NodeRun.run_id == run.id)
-            .order_by(NodeRun.started_at.desc())
-            .limit(1)
-        )
-        nr_res2 = await session.execute(nr_stmt2)
-        nr2 = nr_res2.scalars().first()
-        if nr2 is not None and nr2.finished_at is None:
-            current_node_id = nr2.node_id
-    else:
-        current_node_id = nr.node_id
-
-    return {
+    return _json_response({
         "id": run.id,
         "workflow_id": run.workflow_id,
-        "status": run.status.value if hasattr(run.status, "value") else str(run.status),
-        "started_at": run.started_at.isoformat() if run.started_at else None,
-        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "status": run.status,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
         "trigger_type": run.trigger_type,
         "outputs_json": run.outputs_json,
         "current_node_id": current_node_id,
-    }
+    })
+
+
+@router.get("/runs/{run_id}/outputs")
+async def get_run_outputs(run_id: int, session: AsyncSession = Depends(get_session), user_id: str = Depends(require_user)):
+    result = await session.execute(select(Run.user_id, Run.outputs_json).where(Run.id == run_id))
+    run = result.first()
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run.user_id and run.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    outputs = run.outputs_json
+    # Large outputs are stored in GCS and the row only keeps a pointer; serve the stored JSON bytes as-is
+    if isinstance(outputs, dict) and len(outputs) == 1 and OUTPUTS_GCS_KEY in outputs:
+        data = await asyncio.to_thread(GCSWriter().read_uri, outputs[OUTPUTS_GCS_KEY])
+        return Response(content=data, media_type="application/json")
+    return _json_response(outputs)
+
+
+# Log rows fetched and encoded per chunk of the /runs/{id}/logs response
+_LOG_STREAM_PARTITION = 500
+# Largest page /runs/{id}/logs returns when the caller asks for one with `limit`
+_LOG_PAGE_MAX = 500
 
 
 @router.get("/runs/{run_id}/logs")
-async def get_run_logs(run_id: int, after_id: Optional[int] = None, session: AsyncSession = Depends(get_session), user_id: str = Depends(require_user)):
-    stmt = select(Log).where(Log.run_id == run_id)
+async def get_run_logs(
+    run_id: int,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    include_data: bool = True,
+    session: AsyncSession = Depends(get_session),
+    user_id: str = Depends(require_user),
+):
+    # include_data=false leaves the data_json column out of the query entirely; "data" is then null
+    data_col = Log.data_json if include_data else null()
+    stmt = select(Log.id, Log.run_id, Log.node_id, Log.ts, Log.level, Log.message, data_col).where(Log.run_id == run_id)
     # check authorization via run
-    rchk = await session.execute(select(Run).where(Run.id == run_id))
-    r = rchk.scalar_one_or_none()
+    rchk = await session.execute(_RUN_OWNER, {"run_id": run_id})
+    r = rchk.first()
     if r is None:
         raise HTTPException(status_code=404, detail="Run not found")
     if r.user_id and r.user_id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
     if after_id is not None:
         stmt = stmt.where(Log.id > after_id)
-    stmt = stmt.order_by(Log.ts.asc())
-    result = await session.execute(stmt)
-    rows = result.scalars().all()
+
+    # When limit is provided, page by id (keyset on ix_logs_run_id_id) and return an envelope;
+    # next_cursor is the after_id for the following page
+    if limit is not None:
+        if limit <= 0:
+            raise HTTPException(status_code=400, detail="limit must be positive")
+        page_size = min(limit, _LOG_PAGE_MAX)
+        result = await session.execute(stmt.order_by(Log.id.asc()).limit(page_size + 1))
+        rows_all = result.all()
+        rows = rows_all[:page_size]
+        has_more = len(rows_all) > page_size
+        next_cursor = rows[-1].id if has_more and rows else None
+        return _json_response({"items": _log_items(rows), "next_cursor": next_cursor, "has_more": has_more})
+
+    stmt = stmt.order_by(Log.ts.asc()).execution_options(yield_per=_LOG_STREAM_PARTITION)
+
+    async def body():
+        # Own session: the request-scoped one may be closed before the response body is sent
+        async with SessionFactory() as stream_session:  # type: AsyncSession
+            result = await stream_session.stream(stmt)
+            sep = b""
+            yield b"["
+            async for partition in result.partitions(_LOG_STREAM_PARTITION):
+                # Encode each partition as an array and splice its items into the outer one
+                chunk = orjson.dumps(_log_items(partition), option=orjson.OPT_NON_STR_KEYS)[1:-1]
+                if chunk:
+                    yield sep + chunk
+                    sep = b","
+            yield b"]"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+def _log_items(rows) -> list:
     return [
-        {
-            "id": row.id,
-            "run_id": row.run_id,
-            "node_id": row.node_id,
-            "ts": row.ts.isoformat(),
-            "level": row.level,
-            "message": row.message,
-            "data": row.data_json,
-        }
-        for row in rows
+        {"id": lid, "run_id": rid, "node_id": node_id, "ts": ts, "level": level, "message": message, "data": data}
+        for lid, rid, node_id, ts, level, message, data in rows
     ]
 
 
+# Idle streams send a keepalive comment after this long without output
+_EVENTS_IDLE_RECHECK_SECONDS = 15.0
+# Bounds of the interval between checks of a quiet run; a wakeup cuts the wait short
+_STREAM_POLL_MIN_SECONDS = 0.25
+_STREAM_POLL_MAX_SECONDS = 5.0
+# Log rows read per check; a backlog is sent in slices, each read only after the previous one was sent
+_STREAM_LOG_BATCH = 256
+# Plain rows rather than Log entities: no identity-map or instance bookkeeping per streamed line
+_STREAM_LOGS = (
+    select(Log.id, Log.run_id, Log.node_id, Log.ts, Log.level, Log.message, Log.data_json, Log.event_type)
+    .where(Log.run_id == bindparam("run_id"), Log.id > bindparam("after_id"))
+    .order_by(Log.id.asc())
+    .limit(_STREAM_LOG_BATCH)
+)
+_STREAM_RUN_STATUS = select(Run.user_id, Run.status).where(Run.id == bindparam("run_id"))
+
+
+async def _run_event_stream(run_id: int, user_id: str, wakeups: Optional[asyncio.Queue] = None, request: Optional[Request] = None):
+    """SSE chunks for a run's logs and status until it finishes or the client disconnects.
+
+    It re-checks the run with a delay that backs off while nothing changes. `wakeups` cut that delay short;
+    the re-checks still pick up changes whose wakeup never arrives, e.g. while the LISTEN relay reconnects.
+    """
+    last_id = 0
+    last_status: Optional[str] = None
+    poll_delay = _STREAM_POLL_MIN_SECONDS
+    idle_seconds = 0.0
+    while True:
+        if request is not None and await request.is_disconnected():
+            break
+        async with SessionFactory() as session:  # type: AsyncSession
+            # first, logs since last id
+            log_res = await session.execute(_STREAM_LOGS, {"run_id": run_id, "after_id": last_id})
+            new_rows = log_res.all()
+            # All frames from one read go out as a single chunk, so a burst of logs is one write
+            frames = bytearray()
+            for lid, rid, node_id, ts, level, message, data, event_type in new_rows:
+                entry = {
+                    'id': lid,
+                    'run_id': rid,
+                    'node_id': node_id,
+                    'ts': ts,
+                    'level': level,
+                    'message': message,
+                    'data': data,
+                }
+                frames += _sse({'type':'log', 'entry': entry})
+                # The executor tags node lifecycle rows when it writes them; the event type is its value
+                if event_type is not LogEventType.log and node_id:
+                    frames += _sse({'type':event_type.value, 'node_id': node_id})
+                last_id = max(last_id, lid)
+            if frames:
+                yield bytes(frames)
+            if len(new_rows) == _STREAM_LOG_BATCH:
+                # More backlog to send; the status can wait until the logs have caught up
+                continue
+
+            # then, status update
+            run_res = await session.execute(_STREAM_RUN_STATUS, {"run_id": run_id})
+            run = run_res.first()
+            if run is None:
+                yield _sse({'type':'status', 'status':'not_found'})
+                break
+            if run.user_id and run.user_id != user_id:
+                yield _sse({'type':'status', 'status':'forbidden'})
+                break
+            status = run.status.value
+            changed = bool(new_rows) or status != last_status
+            if status != last_status:
+                last_status = status
+                yield _sse({'type':'status', 'status':status})
+            if status in ('succeeded', 'failed'):
+                break
+
+        # Check quickly while the run is producing output, and back off while it is quiet
+        poll_delay = _STREAM_POLL_MIN_SECONDS if changed else min(poll_delay * 2, _STREAM_POLL_MAX_SECONDS)
+        if wakeups is None:
+            await asyncio.sleep(poll_delay)
+            continue
+        idle_seconds = 0.0 if changed else idle_seconds
+        try:
+            await asyncio.wait_for(wakeups.get(), timeout=poll_delay)
+        except asyncio.TimeoutError:
+            idle_seconds += poll_delay
+            if idle_seconds >= _EVENTS_IDLE_RECHECK_SECONDS:
+                idle_seconds = 0.0
+                yield _SSE_KEEPALIVE
+        # One check covers every notification that arrived meanwhile
+        while not wakeups.empty():
+            wakeups.get_nowait()
+
+
 @router.get("/runs/{run_id}/stream")
-async def stream_run(run_id: int, user_id: str = Depends(require_user)):
+async def stream_run(run_id: int, request: Request, user_id: str = Depends(require_user)):
     async def event_gen():
-        last_id = 0
-        last_status: Optional[str] = None
-        while True:
-            async with SessionFactory() as session:  # type: AsyncSession
-                # first, logs since last id
-                log_stmt = select(Log).where(Log.run_id == run_id, Log.id > last_id).order_by(Log.id.asc())
-                log_res = await session.execute(log_stmt)
-                new_rows = log_res.scalars().all()
-                for row in new_rows:
-                    entry = {
-                        'id': row.id,
-                        'run_id': row.run_id,
-                        'node_id': row.node_id,
-                        'ts': row.ts.isoformat(),
-                        'level': row.level,
-                        'message': row.message,
-                        'data': row.data_json,
-                    }
-                    yield f"data: {json.dumps({'type':'log', 'entry': entry})}\n\n"
-                    msg = row.message or ''
-                    if msg.startswith('Starting node') and row.node_id:
-                        yield f"data: {json.dumps({'type':'node_started', 'node_id': row.node_id})}\n\n"
-                    if (msg.startswith('Finished node') or 'failed' in msg) and row.node_id:
-                        evt = 'node_finished' if msg.startswith('Finished node') else 'node_failed'
-                        yield f"data: {json.dumps({'type':evt, 'node_id': row.node_id})}\n\n"
-                    last_id = max(last_id, row.id)
-
-                # then, status update
-                run_res = await session.execute(select(Run).where(Run.id == run_id))
-                run = run_res.scalar_one_or_none()
-                if run is None:
-                    yield f"data: {json.dumps({'type':'status', 'status':'not_found'})}\n\n"
-                    break
-                if run.user_id and run.user_id != user_id:
-                    yield f"data: {json.dumps({'type':'status', 'status':'forbidden'})}\n\n"
-                    break
-                status = run.status.value if hasattr(run.status, 'value') else str(run.status)
-                if status != last_status:
-                    last_status = status
-                    yield f"data: {json.dumps({'type':'status', 'status':status})}\n\n"
-                if status in ('succeeded', 'failed'):
-                    break
-
-            await asyncio.sleep(1.0)
-
-    return StreamingResponse(event_gen(), media_type="text/event-stream")
+        # Runs publish after every log batch and status commit: directly in this process, and through
+        # the LISTEN relay (engine.notifications) from other processes on Postgres
+        wakeups = events.subscribe(run_id)
+        try:
+            async for chunk in _run_event_stream(run_id, user_id, wakeups, request):
+                yield chunk
+        finally:
+            events.unsubscribe(run_id, wakeups)
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.get("/runs/{run_id}/events")
+async def stream_run_events(run_id: int, request: Request, user_id: str = Depends(require_user)):
+    """Same stream as /runs/{id}/stream; both wake on run NOTIFYs relayed by the app-wide listener."""
+    return await stream_run(run_id, request, user_id)
 
 
 # Alias route to satisfy clients/tests expecting /runs/{run_id}/logs/stream
 @router.get("/runs/{run_id}/logs/stream")
-async def stream_run_logs_alias(run_id: int):
-    return await stream_run(run_id)
+async def stream_run_logs_alias(run_id: int, request: Request):
+    return await stream_run(run_id, request)
 
 
 @router.get("/auth/me")
@@ -578,26 +754,51 @@ class HookPayload(BaseModel):
 
 
 @router.post("/hooks/{slug}")
-async def webhook_trigger(slug: str, body: HookPayload, background_tasks: BackgroundTasks = None, session: AsyncSession = Depends(get_session)):
-    background_tasks = background_tasks or BackgroundTasks()
-    stmt = select(Workflow).where(Workflow.webhook_slug == slug)
-    result = await session.execute(stmt)
-    wf = result.scalar_one_or_none()
-    if wf is None:
+async def webhook_trigger(slug: str, body: HookPayload):
+    try:
+        run_id = await create_and_start_run_by_slug(slug, trigger_type="webhook", trigger_payload=body.payload)
+    except RunQueueFull:
+        raise HTTPException(status_code=503, detail="Too many runs queued; try again later")
+    if run_id is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    run_id = await create_and_start_run(wf.id, trigger_type="webhook", trigger_payload=body.payload, background_tasks=background_tasks)
     return {"id": run_id}
 
 
+# Encoded once per registry size: blocks only ever get added, so a new count means a stale body
+@lru_cache(maxsize=1)
+def _blocks_body(registry_size: int) -> Tuple[bytes, str]:
+    return _with_etag(orjson.dumps({"blocks": list(list_blocks().keys())}))
+
+
+@lru_cache(maxsize=1)
+def _block_specs_body(registry_size: int) -> Tuple[bytes, str]:
+    return _with_etag(orjson.dumps({"blocks": list_block_specs()}, option=orjson.OPT_NON_STR_KEYS))
+
+
+def _with_etag(body: bytes) -> Tuple[bytes, str]:
+    return body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# Lets the UI revalidate the registry at most once a minute; a redeploy with new blocks changes the ETag
+_REGISTRY_CACHE_CONTROL = "public, max-age=60"
+
+
+def _registry_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": _REGISTRY_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/blocks")
-async def get_blocks():
-    reg = list_blocks()
-    return {"blocks": list(reg.keys())}
+async def get_blocks(request: Request):
+    return _registry_response(request, *_blocks_body(block_count()))
 
 
 @router.get("/block-specs")
-async def get_block_specs():
-    return {"blocks": list_block_specs()}
+async def get_block_specs(request: Request):
+    return _registry_response(request, *_block_specs_body(block_count()))
 
 
 class ComposioAuthorizeBody(BaseModel):
@@ -622,6 +823,34 @@ async def composio_authorize(body: ComposioAuthorizeBody, request: Request, user
     return {"redirect_url": getattr(conn_req, 'redirect_url', None), "connection_request_id": getattr(conn_req, "id", None)}
 
 
+_ACCOUNT_ID_FIELDS = ("connected_account_id", "id", "account_id")
+
+
+def _connected_account_ids(connected: Any, connected_account_id: Optional[str]):
+    """Candidate connected-account ids in preference order: the query param, then attributes, then keys."""
+    if connected_account_id:
+        yield connected_account_id
+    if connected is None:
+        return
+    for attr in _ACCOUNT_ID_FIELDS:
+        try:
+            val = getattr(connected, attr, None)
+        except Exception:
+            continue
+        if isinstance(val, str) and val:
+            yield val
+    # Also check dict-like
+    get = getattr(connected, "get", None)
+    if callable(get):
+        for k in _ACCOUNT_ID_FIELDS:
+            try:
+                val = get(k)
+            except Exception:
+                continue
+            if isinstance(val, str) and val:
+                yield val
+
+
 @router.get("/integrations/composio/callback")
 async def composio_callback(
     connection_request_id: Optional[str] = None,
@@ -650,36 +879,8 @@ async def composio_callback(
             connected = client.connected_accounts.wait_for_connection(connection_request_id)
         except Exception:
             connected = None
-    # Extract id robustly
-    candidate_ids: list[str] = []
-    if connected is not None:
-        for attr in ("connected_account_id", "id", "account_id"):
-            try:
-                val = getattr(connected, attr, None)
-                if isinstance(val, str) and val:
-                    candidate_ids.append(val)
-            except Exception:
-                pass
-        # Also check dict-like
-        if hasattr(connected, "get") and callable(getattr(connected, "get")):
-            for k in ("connected_account_id", "id", "account_id"):
-                try:
-                    val = connected.get(k)
-                    if isinstance(val, str) and val:
-                        candidate_ids.append(val)
-                except Exception:
-                    pass
-    if connected_account_id:
-        candidate_ids.insert(0, connected_account_id)
-    # Deduplicate while preserving order
-    seen: set[str] = set()
-    resolved_id = None
-    for cid in candidate_ids:
-        if cid in seen:
-            continue
-        seen.add(cid)
-        resolved_id = cid
-        break
+    # First usable id wins; later candidates are never probed
+    resolved_id = next(_connected_account_ids(connected, connected_account_id), None)
 
     frontend = _frontend_base_url()
     success_url = f"{frontend}/integrations/success"
@@ -688,15 +889,15 @@ async def composio_callback(
         # No connected id available; redirect but do not persist
         return RedirectResponse(url=success_url)
 
-    await session.execute(
-        insert(ComposioAccount).values(
-            user_id=user_id,
-            toolkit=toolkit,
-            connected_account_id=resolved_id,
-            status="active",
+    async with session.begin():
+        await session.execute(
+            insert(ComposioAccount).values(
+                user_id=user_id,
+                toolkit=toolkit,
+                connected_account_id=resolved_id,
+                status="active",
+            )
         )
-    )
-    await session.commit()
     return RedirectResponse(url=success_url)
 
 
@@ -724,41 +925,43 @@ async def list_composio_accounts(toolkit: Optional[str] = None, session: AsyncSe
 async def list_integrations(session: AsyncSession = Depends(get_session), request: Request = None, _creds: HTTPAuthorizationCredentials | None = Depends(auth_scheme_optional)):
     user_id = _current_user_id(request)
     configured_toolkits = settings.COMPOSIO_TOOLKITS
-    # Also include any toolkits that have accounts in DB
-    tk_stmt = select(ComposioAccount.toolkit).where(ComposioAccount.user_id == user_id).distinct()
-    tk_res = await session.execute(tk_stmt)
-    db_toolkits = [row[0] for row in tk_res.all()]
+    # All of the user's accounts in one query, grouped by toolkit here
+    stmt = (
+        select(ComposioAccount.id, ComposioAccount.toolkit, ComposioAccount.connected_account_id, ComposioAccount.status, ComposioAccount.created_at)
+        .where(ComposioAccount.user_id == user_id)
+        .order_by(ComposioAccount.id)
+    )
+    res = await session.execute(stmt)
+    by_toolkit: Dict[str, list[Dict[str, Any]]] = {}
+    for rid, toolkit, connected_account_id, status, created_at in res.all():
+        by_toolkit.setdefault(toolkit, []).append({
+            "id": rid,
+            "connected_account_id": connected_account_id,
+            "status": status,
+            "created_at": created_at.isoformat(),
+        })
     # Preserve configured order, then append any others from DB
-    ordered_toolkits: list[str] = list(dict.fromkeys(list(configured_toolkits) + db_toolkits))
+    ordered_toolkits: list[str] = list(dict.fromkeys(list(configured_toolkits) + list(by_toolkit)))
 
     result: list[Dict[str, Any]] = []
     for tk in ordered_toolkits:
-        stmt = select(ComposioAccount).where(ComposioAccount.user_id == user_id, ComposioAccount.toolkit == tk)
-        res = await session.execute(stmt)
-        rows = res.scalars().all()
+        accounts = by_toolkit.get(tk, [])
         result.append({
             "provider": "composio",
             "toolkit": tk,
-            "connected": len(rows) > 0,
-            "accounts": [
-                {
-                    "id": r.id,
-                    "connected_account_id": r.connected_account_id,
-                    "status": r.status,
-                    "created_at": r.created_at.isoformat(),
-                }
-                for r in rows
-            ],
+            "connected": len(accounts) > 0,
+            "accounts": accounts,
         })
     return {"integrations": result}
 
 
 @router.delete("/integrations/composio/accounts/{account_row_id}")
 async def delete_composio_account(account_row_id: int, session: AsyncSession = Depends(get_session), user_id: str = Depends(require_user)):
-    # Look up by row id and user ownership
+    # Look up by row id and user ownership; the read transaction ends before the remote revoke call
     stmt = select(ComposioAccount).where(ComposioAccount.id == account_row_id, ComposioAccount.user_id == user_id)
-    res = await session.execute(stmt)
-    row = res.scalar_one_or_none()
+    async with session.begin():
+        res = await session.execute(stmt)
+        row = res.scalar_one_or_none()
     if row is None:
         raise HTTPException(status_code=404, detail="Account not found")
 
@@ -783,6 +986,6 @@ async def delete_composio_account(account_row_id: int, session: AsyncSession = D
         except Exception:
             revoked = False
 
-    await session.delete(row)
-    await session.commit()
+    async with session.begin():
+        await session.delete(row)
     return {"deleted": True, "revoked": revoked}
@@ -10,6 +10,9 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 
 from ..db.models import Base
 from ..db.session import engine
+from ..engine.notifications import run_event_listener
+from ..engine.worker import run_workers
+from ..services.http import close_http_client
 from .middleware import add_cors
 from .settings import settings
 from .api import router as api_router
@@ -55,6 +58,15 @@ def create_app() -> FastAPI:
     async def on_startup():
         async with engine.begin() as conn:  # type: ignore[attr-defined]
             await conn.run_sync(Base.metadata.create_all)
+        run_workers.start()
+        run_event_listener.start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await run_event_listener.stop()
+        await run_workers.stop()
+        # After the workers, which may still be using it for in-flight runs
+        await close_http_client()
 
     return app
 
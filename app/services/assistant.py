@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import re
 from collections import OrderedDict
@@ -8,7 +9,7 @@ import logging
 from typing import Any, Dict, List, Optional, Tuple
 
 import openai
-from sqlalchemy import insert
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..schemas.graph import Graph
@@ -18,6 +19,7 @@ from ..db.models import Workflow
 
 CACHE_ENABLED = True
 _ASSISTANT_LRU_CAPACITY = 64
+# sha256(prompt, model, user) -> id of the workflow created for it
 _assistant_cache: OrderedDict[str, int] = OrderedDict()
 _assistant_cache_lock = asyncio.Lock()
 
@@ -263,12 +265,17 @@ Finally, return JSON only for the final workflow. No comments, no markdown, no b
     )
 
 
+_JSON_FENCE_RE = re.compile(r"```json\s*([\s\S]*?)```", re.IGNORECASE)
+
+
 def _extract_json_object(text: str) -> Dict[str, Any]:
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
-    fence = re.search(r"```json\s*([\s\S]*?)```", text, re.IGNORECASE)
+    # Fenced replies cannot parse as-is; skip straight to the fence
+    if not text.lstrip().startswith("```"):
+        try:
+            return json.loads(text)
+        except Exception:
+            pass
+    fence = _JSON_FENCE_RE.search(text)
     if fence:
         candidate = fence.group(1).strip()
         try:
@@ -433,10 +440,12 @@ async def stream_graph_from_prompt(session: AsyncSession, prompt: str, model: Op
         name = (prompt[:60] + ("…" if len(prompt) > 60 else "")).strip()
         description = f"Seeded from assistant: {prompt[:200]}".strip()
         result = await session.execute(
-            insert(Workflow).values(name=name or "Assistant workflow", description=description, webhook_slug=None, graph_json=gdict, user_id=user_id)
+            insert(Workflow)
+            .values(name=name or "Assistant workflow", description=description, webhook_slug=None, graph_json=gdict, user_id=user_id)
+            .returning(Workflow.id)
         )
+        workflow_id = result.scalar_one()
         await session.commit()
-        workflow_id = int(result.inserted_primary_key[0])
         yield {"type": "workflow_created", "id": workflow_id}
     except Exception as ex:
         yield {"type": "error", "message": f"persist_failed: {ex}"}
@@ -496,19 +505,37 @@ def _normalize_agent_tools(gdict: Dict[str, Any]) -> Dict[str, Any]:
     return gdict
 
 
+def _assistant_cache_key(prompt_key: str, model: Optional[str], user_id: Optional[str]) -> str:
+    # Fixed-size key however long the prompt; model and user are part of what produced the workflow
+    return hashlib.sha256("\0".join((prompt_key, model or "", user_id or "")).encode("utf-8")).hexdigest()
+
+
+async def _cached_workflow_usable(session: AsyncSession, workflow_id: int, user_id: Optional[str]) -> bool:
+    # The workflow may have been deleted since it was cached; a miss beats handing out a dead id
+    owner = Workflow.user_id.is_(None) if user_id is None else Workflow.user_id == user_id
+    result = await session.execute(select(Workflow.id).where(Workflow.id == workflow_id, owner))
+    return result.first() is not None
+
+
 async def create_workflow_from_prompt(session: AsyncSession, prompt: str, model: Optional[str], user_id: Optional[str] = None) -> Tuple[int, bool]:
     prompt_key = (prompt or "").strip()
     if not prompt_key:
         raise ValueError("prompt is required")
+    cache_key = _assistant_cache_key(prompt_key, model, user_id)
 
     async with _assistant_cache_lock:
-        cached = _assistant_cache.get(prompt_key)
-        if cached is not None and CACHE_ENABLED:
-            _assistant_cache.move_to_end(prompt_key)
+        cached = _assistant_cache.get(cache_key) if CACHE_ENABLED else None
+    if cached is not None:
+        if await _cached_workflow_usable(session, cached, user_id):
+            async with _assistant_cache_lock:
+                if cache_key in _assistant_cache:
+                    _assistant_cache.move_to_end(cache_key)
             logger.info("assistant.create: cache hit", extra={"workflow_id": int(cached)})
             await asyncio.sleep(5)
 
             return int(cached), True
+        async with _assistant_cache_lock:
+            _assistant_cache.pop(cache_key, None)
 
 
     async def _summarise_prompt_with_openai(prompt: str) -> Tuple[str, str]:
@@ -563,14 +590,15 @@ async def create_workflow_from_prompt(session: AsyncSession, prompt: str, model:
         webhook_slug=None,
         graph_json=gdict,
         user_id=user_id,
-    )
+    ).returning(Workflow.id)
     result = await session.execute(stmt)
+    new_id = result.scalar_one()
     await session.commit()
-    new_id = int(result.inserted_primary_key[0])
     logger.info("assistant.create: workflow persisted", extra={"workflow_id": new_id})
 
+    # Only reached once the graph validated and the workflow was stored, so only good results are cached
     async with _assistant_cache_lock:
-        _assistant_cache[prompt_key] = new_id
+        _assistant_cache[cache_key] = new_id
         if len(_assistant_cache) > _ASSISTANT_LRU_CAPACITY:
             _assistant_cache.popitem(last=False)
 
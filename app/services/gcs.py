@@ -13,6 +13,10 @@ class GCSWriter:
         self._client: Optional[storage.Client] = None
         self._bucket = None
 
+    @property
+    def enabled(self) -> bool:
+        return bool(self._bucket_name)
+
     def _ensure_bucket(self) -> None:
         if not self._bucket_name:
             raise RuntimeError("GCS_BUCKET not configured")
@@ -25,3 +29,10 @@ class GCSWriter:
         blob = self._bucket.blob(path)
         blob.upload_from_string(data, content_type=content_type)
         return f"gs://{self._bucket_name}/{path}"
+
+    def read_uri(self, uri: str) -> bytes:
+        """Download a gs://bucket/path object, which may live outside the configured bucket."""
+        bucket_name, _, path = uri.removeprefix("gs://").partition("/")
+        if self._client is None:
+            self._client = storage.Client()
+        return self._client.bucket(bucket_name).blob(path).download_as_bytes()
@@ -1,7 +1,62 @@
 from __future__ import annotations
 
+import asyncio
+from typing import Optional
+
 import httpx
 
 
+def _supported_encodings() -> str:
+    # Only advertise codings httpx can actually decode in this environment
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # type: ignore  # noqa: F401
+        encodings.append("br")
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore  # noqa: F401
+        encodings.append("zstd")
+    except ImportError:
+        pass
+    return ", ".join(encodings)
+
+
+def _http2_available() -> bool:
+    # httpx only speaks HTTP/2 with the optional h2 package
+    try:
+        import h2  # type: ignore  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+ACCEPT_ENCODING = _supported_encodings()
+
+_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+_SHARED_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+
+_shared_client: Optional[httpx.AsyncClient] = None
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
 def create_http_client() -> httpx.AsyncClient:
-    return httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0))
+    return httpx.AsyncClient(timeout=_TIMEOUT)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client, so runs reuse keep-alive connections. Callers must not close it."""
+    global _shared_client, _shared_loop
+    loop = asyncio.get_running_loop()
+    # Pooled connections belong to the loop that opened them
+    if _shared_client is None or _shared_client.is_closed or _shared_loop is not loop:
+        _shared_client = httpx.AsyncClient(timeout=_TIMEOUT, limits=_SHARED_LIMITS, http2=_http2_available())
+        _shared_loop = loop
+    return _shared_client
+
+
+async def close_http_client() -> None:
+    global _shared_client, _shared_loop
+    client, _shared_client, _shared_loop = _shared_client, None, None
+    if client is not None:
+        await client.aclose()
@@ -44,4 +44,11 @@ def test_audio_stt_with_bytes(monkeypatch):
     }
     blk = AudioSTTBlock({"media": media})
     out = asyncio.get_event_loop().run_until_complete(blk.run({"upstream": {}, "trigger": {}}, ctx))
-    assert "text" in out 
\ No newline at end of file
+    assert "text" in out 
+
+def test_audio_tts_without_key_rejects_text_that_renders_empty(monkeypatch):
+    monkeypatch.setattr("app.blocks.std.audio_tts.settings.OPENAI_API_KEY", None)
+    ctx = RunContext(gcs=GCSWriter(), http=None, logger=lambda m, d=None, node_id=None: asyncio.sleep(0))
+    blk = AudioTTSBlock({"text": "{{ trigger.text }}"})
+    with pytest.raises(ValueError, match="non-empty 'text'"):
+        asyncio.run(blk.run({"upstream": {}, "trigger": {}}, ctx))
@@ -170,4 +170,13 @@ def test_run_unknown_block_fails(client):
     run_id = r.json()["id"]
 
     run = _poll_run(client, run_id)
-    assert run["status"] == "failed" 
\ No newline at end of file
+    assert run["status"] == "failed" 
+
+def test_start_without_trigger_returns_a_fresh_dict():
+    import asyncio
+    from app.blocks.std.start import StartBlock
+
+    first = asyncio.run(StartBlock({}).run({"trigger": None}, None))
+    first["data"]["polluted"] = True
+    second = asyncio.run(StartBlock({}).run({"trigger": None}, None))
+    assert second["data"] == {}
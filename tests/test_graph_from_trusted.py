@@ -0,0 +1,29 @@
+from app.schemas.graph import Graph
+
+
+GRAPH = {
+    "nodes": [
+        {"id": "s", "type": "start", "settings": {}, "position": {"x": 0, "y": 0}},
+        {"id": "a", "type": "show"},
+        {"id": "t", "type": "tool.web_get", "settings": {"name": "fetch"}},
+    ],
+    "edges": [
+        {"id": "e1", "from": "s", "to": "a"},
+        {"id": "e2", "from": "a", "to": "t", "kind": "tool"},
+    ],
+}
+
+
+def test_from_trusted_matches_validated_graph():
+    trusted = Graph.from_trusted(GRAPH)
+    validated = Graph.model_validate(GRAPH)
+    assert trusted._analyze() == validated._analyze()
+    assert [e.from_node for e in trusted.edges] == ["s", "a"]
+    assert trusted.memoize is False
+
+
+def test_from_trusted_accepts_field_names():
+    data = {"nodes": GRAPH["nodes"], "edges": [{"id": "e1", "from_node": "s", "to": "a"}], "memoize": True}
+    graph = Graph.from_trusted(data)
+    assert graph.edges[0].from_node == "s"
+    assert graph.memoize is True
@@ -0,0 +1,34 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+
+from app.blocks.base import RunContext
+from app.blocks.std.http_request import HttpRequestBlock
+
+
+def _client(body: bytes) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body, expected", [(b"42", 42), (b"true", True), (b"null", None), (b'"hi"', "hi")])
+async def test_http_request_accepts_scalar_json_body(body, expected):
+    logger = AsyncMock()
+    async with _client(body) as http:
+        ctx = RunContext(gcs=None, http=http, logger=logger)
+        out = await HttpRequestBlock({"url": "http://example.test/"}).run({"upstream": {}}, ctx)
+
+    assert out["status"] == 200
+    assert out["data"] == expected
+    assert logger.await_args.args[1]["data_preview"] == str(expected)[:1000]
+
+
+@pytest.mark.asyncio
+async def test_http_request_previews_text_body():
+    logger = AsyncMock()
+    async with _client(b"x" * 5000) as http:
+        ctx = RunContext(gcs=None, http=http, logger=logger)
+        out = await HttpRequestBlock({"url": "http://example.test/"}).run({"upstream": {}}, ctx)
+
+    assert out["data"] == "x" * 5000
+    assert logger.await_args.args[1]["data_preview"] == "x" * 1000
@@ -28,4 +28,26 @@ def test_render_settings_and_trigger():
 
 def test_render_non_string_template():
     b = Block(settings={})
-    assert b.render_expression(123, upstream={}) == "123" 
\ No newline at end of file
+    assert b.render_expression(123, upstream={}) == "123" 
+
+def test_render_reuses_compiled_template_across_contexts():
+    b = Block(settings={})
+    tmpl = "Hello {{ user.name }}"
+    assert b.render_expression(tmpl, upstream={"user": {"name": "Alice"}}) == "Hello Alice"
+    assert b.render_expression(tmpl, upstream={"user": {"name": "Bob"}}) == "Hello Bob"
+
+
+def test_render_plain_string_passthrough():
+    b = Block(settings={})
+    assert b.render_expression("https://api.example.com/v1", upstream={}) == "https://api.example.com/v1"
+
+
+def test_render_single_reference_matches_jinja():
+    b = Block(settings={})
+    upstream = {"start": {"data": {"n": 3, "url": "https://x.test", "obj": {"a": 1}, "none": None}}}
+    assert b.render_expression("{{ start.data.url }}", upstream=upstream) == "https://x.test"
+    assert b.render_expression("{{start.data.n}}", upstream=upstream) == "3"
+    assert b.render_expression("{{ start.data.obj }}", upstream=upstream) == "{'a': 1}"
+    assert b.render_expression("{{ start.data.none }}", upstream=upstream) == "None"
+    # Missing keys still use the lenient fallback
+    assert b.render_expression("{{ start.data.missing }}", upstream=upstream) == ""
@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.blocks.base import RunContext
+from app.blocks.std import llm_simple
+from app.blocks.std.llm_simple import LlmSimpleBlock
+
+
+def _fake_openai(text: str) -> MagicMock:
+    completion = MagicMock()
+    completion.choices = [MagicMock(message=MagicMock(content=text))]
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=completion)
+    client.close = AsyncMock()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_llm_simple_reuses_cached_completion(monkeypatch):
+    monkeypatch.setattr(llm_simple.settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm_simple.settings, "LLM_CACHE_DISABLED", False)
+    monkeypatch.setattr(llm_simple, "_LLM_CACHE", llm_simple.OrderedDict())
+    client = _fake_openai("hello")
+    monkeypatch.setattr(llm_simple, "AsyncOpenAI", MagicMock(return_value=client))
+    ctx = RunContext(gcs=None, http=None, logger=AsyncMock())
+
+    blk = LlmSimpleBlock({"prompt": "Say hi", "model": "gpt-4o-mini"})
+    first = await blk.run({"upstream": {}}, ctx)
+    second = await blk.run({"upstream": {}}, ctx)
+
+    assert first == second == {"text": "hello"}
+    assert client.chat.completions.create.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_simple_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(llm_simple.settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm_simple.settings, "LLM_CACHE_DISABLED", True)
+    monkeypatch.setattr(llm_simple, "_LLM_CACHE", llm_simple.OrderedDict())
+    client = _fake_openai("hello")
+    monkeypatch.setattr(llm_simple, "AsyncOpenAI", MagicMock(return_value=client))
+    ctx = RunContext(gcs=None, http=None, logger=AsyncMock())
+
+    blk = LlmSimpleBlock({"prompt": "Say hi", "model": "gpt-4o-mini"})
+    await blk.run({"upstream": {}}, ctx)
+    await blk.run({"upstream": {}}, ctx)
+
+    assert client.chat.completions.create.await_count == 2
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.engine.logging import _LOG_QUEUE_MAXSIZE, AsyncLogListener
+
+
+class _FlakySession:
+    """Fails the first write and the rollback after it, like a dropped connection."""
+
+    def __init__(self):
+        self.failures = 1
+        self.committed = []
+        self._pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="sqlite"))
+
+    async def execute(self, stmt, rows=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection dropped")
+        self._pending.extend(rows or [])
+
+    async def commit(self):
+        self.committed.extend(self._pending)
+        self._pending = []
+
+    async def rollback(self):
+        raise ConnectionError("connection dropped")
+
+
+@pytest.mark.asyncio
+async def test_failed_rollback_does_not_kill_the_writer():
+    session = _FlakySession()
+    listener = AsyncLogListener(lambda: session)
+    listener.start()
+    listener.enqueue(1, "lost")
+    await asyncio.sleep(0)
+    listener.enqueue(1, "kept")
+    await listener.stop()
+    assert [r["message"] for r in session.committed] == ["kept"]
+
+
+@pytest.mark.asyncio
+async def test_stop_returns_when_writer_died_with_a_full_queue():
+    def broken_factory():
+        raise ConnectionError("no database")
+
+    listener = AsyncLogListener(broken_factory)
+    listener.start()
+    await asyncio.sleep(0)
+    for i in range(_LOG_QUEUE_MAXSIZE + 1):
+        listener.enqueue(1, f"line {i}")
+    await asyncio.wait_for(listener.stop(), timeout=1)
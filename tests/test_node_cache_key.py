@@ -0,0 +1,25 @@
+from app.engine.executor import _digest, _node_cache_key
+
+
+def _input(settings, trigger=None):
+    return {"settings": settings, "upstream": {}, "trigger": trigger or {}, "node_id": "n1", "user_id": "u1"}
+
+
+def test_cache_key_ignores_dict_ordering_and_node_id():
+    a = _node_cache_key("math.add", _input({"a": 1, "b": 2}), [("p", _digest({"x": 1}))])
+    other = _input({"b": 2, "a": 1})
+    other["node_id"] = "n2"
+    b = _node_cache_key("math.add", other, [("p", _digest({"x": 1}))])
+    assert a is not None and a == b
+
+
+def test_cache_key_changes_with_inputs():
+    base = _node_cache_key("math.add", _input({"a": 1}), [])
+    assert base != _node_cache_key("math.add", _input({"a": 2}), [])
+    assert base != _node_cache_key("math.add", _input({"a": 1}, trigger={"k": 1}), [])
+    assert base != _node_cache_key("transform.uppercase", _input({"a": 1}), [])
+
+
+def test_cache_key_skips_unhashable_upstream():
+    assert _digest({"raw": b"\x00"}) is None
+    assert _node_cache_key("math.add", _input({}), [("p", None)]) is None
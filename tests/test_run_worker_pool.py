@@ -0,0 +1,18 @@
+import pytest
+
+from app.engine.worker import RunQueueFull, RunWorkerPool
+
+
+def test_admit_refuses_beyond_max_pending():
+    pool = RunWorkerPool(1, max_pending=2)
+    pool.admit()
+    pool.admit()
+    with pytest.raises(RunQueueFull):
+        pool.admit()
+
+
+def test_release_frees_an_admitted_slot():
+    pool = RunWorkerPool(1, max_pending=1)
+    pool.admit()
+    pool.release()
+    pool.admit()